@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the Microsoft Learn documentation monitor.
+
+Generates a corpus of synthetic Learn-like HTML pages (configurable size,
+amount of page chrome, and edit rate between two snapshots) and measures
+throughput and peak memory of the monitor's pipeline stages at several
+watchlist sizes:
+
+- extract_main_content  - per page, with the default (auto) extractor
+- extract_bs4           - per page, BeautifulSoup extractor
+- extract_lxml          - per page, lxml extractor (skipped if lxml isn't installed)
+- compute_hash          - per page
+- compute_simhash       - per page, the near-duplicate fingerprint
+- boilerplate_strip     - per page, with a model learned from the sampled pages
+- classify_change       - per edited page, diffing the whole page
+- classify_blocks       - per edited page, diffing only changed sections
+- diff_difflib          - per edited page, difflib.unified_diff over the whole page
+- diff_histogram        - per edited page, the monitor's unified_diff over the whole page
+- docs_index_build      - once per watchlist size, parsing the real docs/ tree
+- docs_index_cached     - once per watchlist size, from a warm docs link cache
+- find_affected_files   - per edited page, against the prebuilt index
+- save_state            - once per watchlist size (state file + snapshots)
+
+Per-page stages are timed on up to --sample pages and reported as
+throughput, plus a projected total for the full watchlist size.
+save_state is always measured at full size, since its cost grows with
+the watchlist.
+
+With --cassette DIR, the extract and diff stages are also run on real pages
+from a recorded cassette (see --record in learn_monitor.py): each page is
+diffed against a copy with a few lines deleted, inserted or rewritten.
+extract_lxml also reports how many pages fell back to BeautifulSoup.
+
+Usage:
+    python scripts/benchmark_learn_monitor.py
+    python scripts/benchmark_learn_monitor.py --sizes 200 --cassette cassettes/2026-01-26
+    python scripts/benchmark_learn_monitor.py --sizes 200,2000 --page-kb 120 --output bench.json
+    python scripts/benchmark_learn_monitor.py --compare old.json new.json
+
+The JSON result file records the git commit, parameters, and per-stage
+numbers, so results can be compared between commits with --compare.
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Handle Windows encoding
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+sys.path.insert(0, str(Path(__file__).parent))
+import learn_monitor as lm  # noqa: E402
+from docs_link_index import DocsLinkCache  # noqa: E402
+
+DEFAULT_SIZES = [200, 2_000, 20_000]
+DEFAULT_SAMPLE = 200
+DEFAULT_PAGE_KB = 80
+DEFAULT_CHROME_LINES = 25
+DEFAULT_EDIT_RATE = 0.1
+MEMORY_SAMPLE = 20  # calls traced with tracemalloc per stage
+
+CHROME_LINES = [
+    "Table of contents", "Exit editor mode", "Ask Learn", "Focus mode", "Read in English",
+    "Add to plan", "Edit", "Share via", "Facebook", "x.com", "LinkedIn", "Email", "Print",
+    "Feedback", "Summarize this article for me", "In this article", "Was this page helpful?",
+    "Yes", "No", "Need help with this topic?", "Additional resources", "Training",
+    "Documentation", "Events", "Theme",
+]
+WORDS = (
+    "agent environment policy tenant admin center governance connector data loss prevention "
+    "retention label sensitivity audit log compliance workload user group role license "
+    "configure enable review assign monitor report export capability feature setting"
+).split()
+EDITS = [
+    "Select Save, then go to the Policies tab.",
+    "This setting is deprecated and will be retired.",
+    "Important: A Microsoft 365 E5 license is required.",
+    "The feature is now generally available.",
+    "Updated wording for clarity.",
+]
+
+
+# === Synthetic Corpus ===
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def generate_sections(rng: random.Random, page_kb: int) -> list[list[str]]:
+    """Generate a page body as a list of sections, each a list of paragraphs."""
+    sections, size = [], 0
+    while size < page_kb * 1024 * 0.6:  # leave room for markup and chrome
+        paragraphs = [" ".join(_sentence(rng) for _ in range(rng.randint(2, 5)))
+                      for _ in range(rng.randint(3, 8))]
+        if rng.random() < 0.3:
+            paragraphs.append("Note")
+        sections.append(paragraphs)
+        size += sum(len(p) for p in paragraphs)
+    return sections
+
+
+def edit_sections(rng: random.Random, sections: list[list[str]]) -> list[list[str]]:
+    """Return a copy of ``sections`` with a few paragraphs rewritten."""
+    edited = [list(s) for s in sections]
+    for _ in range(rng.randint(1, 3)):
+        section = rng.choice(edited)
+        section[rng.randrange(len(section))] = rng.choice(EDITS)
+    return edited
+
+
+def render_page(title: str, sections: list[list[str]], chrome_lines: int) -> str:
+    """Render sections as Learn-like HTML, with head metadata and page chrome."""
+    chrome = "".join(f"<span>{CHROME_LINES[i % len(CHROME_LINES)]}</span>"
+                     for i in range(chrome_lines))
+    body = "".join(
+        f"<h2 id=\"s{i}\">Section {i}</h2>" + "".join(f"<p>{p}</p>" for p in paragraphs)
+        for i, paragraphs in enumerate(sections)
+    )
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>{title}</title>"
+        "<meta name=\"ms.date\" content=\"01/15/2026\">"
+        "<meta name=\"updated_at\" content=\"2026-01-15 05:00 PM\">"
+        "<script>window.config = {};</script><style>body { margin: 0; }</style>"
+        "</head><body>"
+        "<header><nav><a href=\"/\">Learn</a></nav></header>"
+        f"<main><div class=\"chrome\">{chrome}</div><h1>{title}</h1>{body}"
+        "<div class=\"feedback-section\">Feedback</div>"
+        "<div class=\"page-metadata\">Last updated on 01/15/2026</div></main>"
+        "<footer>Privacy</footer></body></html>"
+    )
+
+
+def generate_corpus(count: int, page_kb: int, chrome_lines: int, edit_rate: float,
+                    seed: int = 0) -> list[tuple[str, str]]:
+    """
+    Generate ``count`` (old_html, new_html) snapshot pairs.
+    A fraction ``edit_rate`` of pages differ between the two snapshots.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        sections = generate_sections(rng, page_kb)
+        old_html = render_page(f"Synthetic page {i}", sections, chrome_lines)
+        if rng.random() < edit_rate:
+            new_html = render_page(f"Synthetic page {i}", edit_sections(rng, sections), chrome_lines)
+        else:
+            new_html = old_html
+        corpus.append((old_html, new_html))
+    return corpus
+
+
+# === Measurement ===
+def measure(stage: str, urls: int, calls: list, projected_calls: int) -> dict:
+    """Time ``calls`` (zero-argument callables), then trace peak memory on a few of them."""
+    start = time.perf_counter()
+    for call in calls:
+        call()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    for call in calls[:MEMORY_SAMPLE]:
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_call = seconds / len(calls) if calls else 0.0
+    return {
+        "urls": urls,
+        "stage": stage,
+        "calls": len(calls),
+        "seconds": round(seconds, 6),
+        "per_second": round(len(calls) / seconds, 2) if seconds else None,
+        "projected_calls": projected_calls,
+        "projected_seconds": round(per_call * projected_calls, 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def benchmark_size(n: int, corpus: list[tuple[str, str]], watchlist: list[str],
+                   sample: int) -> list[dict]:
+    """Run every stage for a watchlist of ``n`` URLs."""
+    pages = [corpus[i % len(corpus)] for i in range(min(n, sample))]
+    edited = [(old, new) for old, new in pages if old is not new]
+    projected_edits = round(n * len(edited) / len(pages)) if pages else 0
+
+    old_texts = [lm.extract_main_content(old) for old, _ in edited]
+    new_texts = [lm.extract_main_content(new) for _, new in edited]
+    old_blocks = [lm.compute_blocks(*lm.extract_page(old)) for old, _ in edited]
+    new_blocks = [lm.compute_blocks(*lm.extract_page(new)) for _, new in edited]
+    normalized = [lm.extract_main_content(new) for _, new in pages]
+
+    boilerplate = lm.BoilerplateModel.build(normalized)
+    docs_index = lm.DocsLinkIndex.build(lm.DOCS_DIR, DocsLinkCache(lm.DOCS_DIR, cache_path=None))
+    results = [
+        measure("extract_main_content", n,
+                [lambda h=new: lm.extract_main_content(h) for _, new in pages], n),
+        measure("compute_hash", n,
+                [lambda t=t: lm.compute_hash(t) for t in normalized], n),
+        measure("compute_simhash", n,
+                [lambda t=t: lm.compute_simhash(t) for t in normalized], n),
+        measure("boilerplate_strip", n,
+                [lambda t=t: boilerplate.strip(t) for t in normalized], n),
+        measure("classify_change", n,
+                [lambda a=a, b=b: lm.classify_change(a, b) for a, b in zip(old_texts, new_texts)],
+                projected_edits),
+        measure("classify_blocks", n,
+                [lambda a=a, ab=ab, b=b, bb=bb: lm.classify_blocks(a, ab, b, bb)
+                 for a, ab, b, bb in zip(old_texts, old_blocks, new_texts, new_blocks)],
+                projected_edits),
+        *benchmark_extract(n, [new for _, new in pages], n),
+        *benchmark_diff(n, list(zip(old_texts, new_texts)), projected_edits),
+        measure("docs_index_build", n,
+                [lambda: lm.DocsLinkIndex.build(lm.DOCS_DIR, DocsLinkCache(lm.DOCS_DIR, cache_path=None))],
+                1),
+        measure("find_affected_files", n,
+                [lambda u=watchlist[i % len(watchlist)]:
+                 lm.find_affected_files(u, lm.DOCS_DIR, docs_index)
+                 for i in range(len(edited))],
+                projected_edits),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshots = lm.SnapshotStore(Path(tmp) / "snapshots")
+        now = datetime.now(timezone.utc).isoformat()
+        state = {"schema_version": 2, "last_run": now, "urls": {}, "statistics": {}}
+        for i in range(n):
+            text = normalized[i % len(normalized)]
+            state["urls"][f"https://learn.microsoft.com/en-us/synthetic/page-{i}"] = {
+                "content_hash": snapshots.put(text),
+                "last_checked": now,
+                "last_status": 200,
+                "last_changed": now,
+                "topic": f"Synthetic page {i}",
+                "section": "Synthetic",
+            }
+        state_path = Path(tmp) / "state.json"
+        cache_path = Path(tmp) / "docs-link-index.json"
+        warm = DocsLinkCache(lm.DOCS_DIR, cache_path)
+        lm.DocsLinkIndex.build(lm.DOCS_DIR, warm)
+        warm.save()
+        results.append(measure("docs_index_cached", n,
+                               [lambda: lm.DocsLinkIndex.build(lm.DOCS_DIR,
+                                                               DocsLinkCache(lm.DOCS_DIR, cache_path))],
+                               1))
+        results.append(measure("save_state", n, [lambda: lm.save_state(state, state_path)], 1))
+        results[-1]["state_bytes"] = state_path.stat().st_size
+    return results
+
+
+def benchmark_diff(n: int, pairs: list[tuple[str, str]], projected_calls: int,
+                   prefix: str = "") -> list[dict]:
+    """Time difflib against the monitor's histogram diff on the same text pairs."""
+    line_pairs = [(a.splitlines(keepends=True), b.splitlines(keepends=True)) for a, b in pairs]
+    return [
+        measure(f"{prefix}diff_difflib", n,
+                [lambda a=a, b=b: list(difflib.unified_diff(a, b, lineterm=''))
+                 for a, b in line_pairs],
+                projected_calls),
+        measure(f"{prefix}diff_histogram", n,
+                [lambda a=a, b=b: list(lm.unified_diff(a, b)) for a, b in line_pairs],
+                projected_calls),
+    ]
+
+
+def benchmark_extract(n: int, pages: list[str], projected_calls: int,
+                      prefix: str = "") -> list[dict]:
+    """Time the BeautifulSoup extractor against the lxml one on the same pages."""
+    results = [
+        measure(f"{prefix}extract_bs4", n,
+                [lambda h=h: lm.extract_page(h, "bs4") for h in pages], projected_calls),
+    ]
+    if lm.lxml_etree is not None:
+        results.append(measure(f"{prefix}extract_lxml", n,
+                               [lambda h=h: lm.extract_page(h, "lxml") for h in pages],
+                               projected_calls))
+        results[-1]["fallbacks"] = sum(lm._extract_page_lxml(h) is None for h in pages)
+    return results
+
+
+def load_cassette_html(root: Path) -> list[str]:
+    """The HTML of every 200 response in a cassette."""
+    cassette = lm.Cassette(root)
+    digests = sorted({i["body"] for i in cassette.interactions.values()
+                      if i["status"] == 200 and i.get("body")})
+    return [cassette.body({"body": digest}).decode("utf-8", errors="replace")
+            for digest in digests]
+
+
+def load_cassette_pages(root: Path, seed: int = 0) -> list[tuple[str, str]]:
+    """
+    Extract the text of every 200 response in a cassette and pair it with a
+    copy that has a few lines deleted, inserted or rewritten.
+    """
+    rng = random.Random(seed)
+    pairs = []
+    for html in load_cassette_html(root):
+        lines = lm.extract_main_content(html).splitlines(keepends=True)
+        edited = list(lines)
+        for _ in range(max(1, len(lines) // 100)):
+            position = rng.randrange(len(edited) + 1)
+            op = rng.random()
+            if op < 0.3 and position < len(edited):
+                del edited[position]
+            elif op < 0.6 or position == len(edited):
+                edited.insert(position, rng.choice(EDITS) + "\n")
+            else:
+                edited[position] = rng.choice(EDITS) + "\n"
+        pairs.append(("".join(lines), "".join(edited)))
+    return pairs
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=lm.PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path: Path, new_path: Path) -> int:
+    """Print per-stage throughput change between two result files."""
+    old = json.loads(old_path.read_text(encoding="utf-8"))
+    new = json.loads(new_path.read_text(encoding="utf-8"))
+    baseline = {(r["urls"], r["stage"]): r for r in old["results"]}
+    print(f"{'URLs':>7}  {'Stage':<22} {'old/s':>10} {'new/s':>10} {'change':>8}")
+    for r in new["results"]:
+        before = baseline.get((r["urls"], r["stage"]))
+        if not before or not before["per_second"] or not r["per_second"]:
+            continue
+        change = (r["per_second"] / before["per_second"] - 1) * 100
+        print(f"{r['urls']:>7}  {r['stage']:<22} {before['per_second']:>10.1f} "
+              f"{r['per_second']:>10.1f} {change:>+7.1f}%")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Learn monitor pipeline")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated watchlist sizes (default: 200,2000,20000)")
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE,
+                        help=f"Pages timed per per-page stage (default: {DEFAULT_SAMPLE})")
+    parser.add_argument("--page-kb", type=int, default=DEFAULT_PAGE_KB,
+                        help=f"Approximate HTML size per page (default: {DEFAULT_PAGE_KB})")
+    parser.add_argument("--chrome-lines", type=int, default=DEFAULT_CHROME_LINES,
+                        help=f"Page chrome lines inside <main> (default: {DEFAULT_CHROME_LINES})")
+    parser.add_argument("--edit-rate", type=float, default=DEFAULT_EDIT_RATE,
+                        help=f"Fraction of pages edited between snapshots (default: {DEFAULT_EDIT_RATE})")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    parser.add_argument("--output", type=Path, default=Path("learn-monitor-benchmark.json"),
+                        help="JSON result file (default: learn-monitor-benchmark.json)")
+    parser.add_argument("--cassette", type=Path, metavar="DIR",
+                        help="Also benchmark the extract and diff stages on pages from a "
+                             "recorded cassette")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("OLD", "NEW"),
+                        help="Compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(*args.compare)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    print(f"Generating {args.sample} synthetic pages (~{args.page_kb} KB, "
+          f"edit rate {args.edit_rate})...")
+    corpus = generate_corpus(args.sample, args.page_kb, args.chrome_lines, args.edit_rate, args.seed)
+    watchlist = [e.url for e in lm.parse_watchlist(lm.WATCHLIST_PATH)]
+
+    results = []
+    for n in sizes:
+        print(f"\n{n} URLs")
+        for r in benchmark_size(n, corpus, watchlist, args.sample):
+            results.append(r)
+            print(f"  {r['stage']:<22} {r['per_second'] or 0:>10.1f}/s  "
+                  f"projected {r['projected_seconds']:>9.2f}s  peak {r['peak_kb']:>9.1f} KB")
+
+    if args.cassette:
+        html = load_cassette_html(args.cassette)
+        pairs = load_cassette_pages(args.cassette, args.seed)
+        print(f"\nCassette {args.cassette}: {len(pairs)} pages")
+        for r in [*benchmark_extract(len(html), html, len(html), prefix="cassette_"),
+                  *benchmark_diff(len(pairs), pairs, len(pairs), prefix="cassette_")]:
+            results.append(r)
+            print(f"  {r['stage']:<22} {r['per_second'] or 0:>10.1f}/s  "
+                  f"projected {r['projected_seconds']:>9.2f}s  peak {r['peak_kb']:>9.1f} KB")
+
+    output = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()
+                       if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(output, indent=2), encoding="utf-8")
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Persistent per-file link and anchor facts for the docs tree.
+
+Purpose
+- Parse each docs markdown file once and reuse the result across runs and tools.
+- Shared by the Learn monitor (Learn links and titles per control/playbook) and
+  the anchor validator (fragment links and anchors per page).
+
+Cache
+- Stored as JSON at data/docs-link-index.json (not committed).
+- Entries are keyed by path relative to the docs root and validated by file size
+  and mtime. When either differs, the file's SHA-256 is compared with the stored
+  one before re-parsing, so a checkout or touch that leaves content unchanged
+  does not force a re-parse.
+- Bump PARSER_VERSION when the extracted facts change; older caches are discarded.
+
+Usage
+    cache = DocsLinkCache(docs_dir)
+    facts = cache.facts(path)      # DocFacts, or None if the file can't be read
+    cache.save()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DOCS_DIR = PROJECT_ROOT / "docs"
+DEFAULT_CACHE_PATH = PROJECT_ROOT / "data" / "docs-link-index.json"
+
+PARSER_VERSION = 1
+
+LEARN_LINK_RE = re.compile(r"https://learn\.microsoft\.com[^\s)\]>\"'|`]*", re.IGNORECASE)
+
+MARKDOWN_LINK_RE = re.compile(r"\[[^\]]+\]\(([^)]+)\)")
+
+_TITLE_RE = re.compile(r"^#\s+(.+)$", re.MULTILINE)
+
+# HTML anchor: <a id="foo"></a>
+_HTML_ID_RE = re.compile(r"<a\s+id=\"([^\"]+)\"\s*></a>", re.IGNORECASE)
+
+# Attr_list heading IDs: ## Title {#foo}
+_ATTR_LIST_ID_RE = re.compile(r"\{#([A-Za-z0-9][A-Za-z0-9_-]*)\}\s*$")
+
+# Markdown headings: # / ## / ### ...
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$")
+
+
+@dataclass
+class DocFacts:
+    title: Optional[str] = None
+    learn_links: list[str] = field(default_factory=list)
+    fragment_links: list[tuple[int, str]] = field(default_factory=list)  # (line, raw target)
+    anchors: list[str] = field(default_factory=list)
+
+
+def _strip_inline_code(text: str) -> str:
+    return re.sub(r"`[^`]+`", "", text)
+
+
+def slugify_heading(text: str) -> str:
+    """Best-effort slugifier for MkDocs-style heading IDs."""
+    text = _strip_inline_code(text)
+    text = text.strip().lower()
+
+    # Remove common punctuation, keep alphanumerics, spaces, underscores, hyphens.
+    text = re.sub(r"[^a-z0-9 _-]", "", text)
+    text = text.replace("_", "-")
+    text = re.sub(r"\s+", "-", text)
+    text = re.sub(r"-+", "-", text).strip("-")
+    return text
+
+
+def collect_anchors(md_text: str) -> set[str]:
+    anchors: set[str] = set()
+
+    for match in _HTML_ID_RE.finditer(md_text):
+        anchors.add(match.group(1).strip())
+
+    for line in md_text.splitlines():
+        heading_match = _HEADING_RE.match(line)
+        if not heading_match:
+            continue
+
+        heading_text = heading_match.group(2).strip()
+
+        # If explicit {#id} is present at end, use it and also consider the slug of the visible text.
+        id_match = _ATTR_LIST_ID_RE.search(heading_text)
+        if id_match:
+            anchors.add(id_match.group(1))
+            heading_text = _ATTR_LIST_ID_RE.sub("", heading_text).strip()
+
+        slug = slugify_heading(heading_text)
+        if slug:
+            anchors.add(slug)
+
+    return anchors
+
+
+def parse_markdown(md_text: str) -> DocFacts:
+    title_match = _TITLE_RE.search(md_text)
+    fragment_links = [
+        (i, link_match.group(1))
+        for i, line in enumerate(md_text.splitlines(), start=1)
+        for link_match in MARKDOWN_LINK_RE.finditer(line)
+        if "#" in link_match.group(1)
+    ]
+    return DocFacts(
+        title=title_match.group(1) if title_match else None,
+        learn_links=sorted({m.group(0).rstrip(".,;:") for m in LEARN_LINK_RE.finditer(md_text)}),
+        fragment_links=fragment_links,
+        anchors=sorted(collect_anchors(md_text)),
+    )
+
+
+class DocsLinkCache:
+    """mtime/size-validated cache of DocFacts for files under one docs root."""
+
+    def __init__(self, docs_dir: Path = DOCS_DIR, cache_path: Optional[Path] = DEFAULT_CACHE_PATH):
+        self.docs_dir = docs_dir.resolve()
+        self.cache_path = cache_path
+        self.entries: dict[str, dict] = {}
+        self.parsed = 0
+        self.reused = 0
+        self._dirty = False
+        self._memo: dict[str, Optional[DocFacts]] = {}
+        self._load()
+
+    def _load(self):
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") != PARSER_VERSION or data.get("docs_dir") != str(self.docs_dir):
+            return
+        self.entries = data.get("files", {})
+
+    def _key(self, path: Path) -> str:
+        path = path.resolve()
+        try:
+            return path.relative_to(self.docs_dir).as_posix()
+        except ValueError:
+            return str(path)
+
+    def facts(self, path: Path) -> Optional[DocFacts]:
+        key = self._key(path)
+        if key not in self._memo:
+            self._memo[key] = self._facts(path, key)
+        return self._memo[key]
+
+    def _facts(self, path: Path, key: str) -> Optional[DocFacts]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+
+        entry = self.entries.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            self.reused += 1
+            return self._from_entry(entry)
+
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            return None
+        digest = hashlib.sha256(raw).hexdigest()
+        self._dirty = True
+
+        if entry and entry["sha256"] == digest:
+            entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+            self.reused += 1
+            return self._from_entry(entry)
+
+        try:
+            text = raw.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            self.entries.pop(key, None)
+            return None
+
+        facts = parse_markdown(text)
+        self.entries[key] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+            "facts": asdict(facts),
+        }
+        self.parsed += 1
+        return facts
+
+    @staticmethod
+    def _from_entry(entry: dict) -> DocFacts:
+        facts = entry["facts"]
+        return DocFacts(
+            title=facts["title"],
+            learn_links=facts["learn_links"],
+            fragment_links=[tuple(link) for link in facts["fragment_links"]],
+            anchors=facts["anchors"],
+        )
+
+    def save(self):
+        """Write the cache, dropping entries for files that no longer exist."""
+        if self.cache_path is None:
+            return
+        for key in list(self.entries):
+            path = Path(key) if os.path.isabs(key) else self.docs_dir / key
+            if not path.exists():
+                del self.entries[key]
+                self._dirty = True
+        if not self._dirty:
+            return
+
+        data = {"version": PARSER_VERSION, "docs_dir": str(self.docs_dir), "files": self.entries}
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.cache_path)
+        self._dirty = False
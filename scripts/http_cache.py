@@ -0,0 +1,326 @@
+"""Shared on-disk HTTP cache for requests sessions.
+
+Purpose
+- Serve repeat GETs of the same URL from disk, across runs and across tools:
+  the Learn monitor's main run, its --url debug mode, and any other script
+  that mounts CachingAdapter on its session.
+
+Cache
+- Stored under data/http-cache/ (not committed), one gzip file per response:
+  a JSON header line (status, headers, storage time) then the decoded body.
+- Keyed by URL. A response with a Vary header is stored per value of the
+  varying request headers, and a small pointer entry under the URL key
+  records which headers vary.
+- Freshness follows RFC 7234 for a private cache: Cache-Control max-age,
+  else Expires, else the configured TTL (in place of heuristic freshness).
+  no-store responses and requests bypass the cache; no-cache responses are
+  stored but always revalidated. Stale entries are revalidated with
+  If-None-Match/If-Modified-Since and refreshed on 304.
+- A fresh entry answers a conditional request itself, with a 304 when the
+  caller's validator matches.
+- Size-bounded: once the files exceed max_bytes, the least recently used
+  entries (by file mtime, bumped on every hit) are deleted.
+
+Usage
+    cache = HTTPCache(DEFAULT_CACHE_DIR, ttl=3600)
+    session.mount("https://", CachingAdapter(requests.adapters.HTTPAdapter(), cache))
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CACHE_DIR = PROJECT_ROOT / "data" / "http-cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 3600  # seconds, for responses without max-age or Expires
+
+FORMAT_VERSION = 1
+# Added to responses served from the cache: HIT or REVALIDATED
+CACHE_STATUS_HEADER = "X-HTTP-Cache"
+
+# Cacheable by default (RFC 7231 section 6.1)
+CACHEABLE_STATUSES = {200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501}
+# Bodies are stored decoded, so transfer framing no longer applies
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+# Never taken from a 304 when refreshing a stored response
+NOT_MODIFIED_SKIP = DROPPED_HEADERS | {"content-type"}
+
+_DIRECTIVE_RE = re.compile(r"\s*([\w-]+)\s*(?:=\s*(\"[^\"]*\"|[^,]*))?\s*(?:,|$)")
+
+
+def parse_cache_control(value: Optional[str]) -> dict:
+    """Cache-Control directives as {name: value or None}, names lowercased."""
+    directives = {}
+    for name, arg in _DIRECTIVE_RE.findall(value or ""):
+        directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _seconds(value: Optional[str]) -> Optional[int]:
+    try:
+        return max(0, int(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers, ttl: float) -> float:
+    """Seconds a response stays fresh (RFC 7234 section 4.2.1)."""
+    directives = parse_cache_control(headers.get("Cache-Control"))
+    if "no-cache" in directives:
+        return 0
+    max_age = _seconds(directives.get("max-age"))
+    if max_age is not None:
+        return max_age
+    expires = headers.get("Expires")
+    if expires is not None:
+        expires_at = _http_date(expires)
+        date = _http_date(headers.get("Date"))
+        # An invalid Expires means already expired
+        return max(0.0, expires_at - date) if expires_at and date else 0
+    return ttl
+
+
+def _etags(value: Optional[str]) -> set:
+    return {tag.strip().removeprefix("W/") for tag in (value or "").split(",") if tag.strip()}
+
+
+class HTTPCache:
+    """Thread-safe, size-bounded store of HTTP responses under one directory."""
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # counted on first write
+
+    def count(self, outcome: str):
+        """Add one to ``hits``, ``revalidated`` or ``misses`` (called from fetch threads)."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    @staticmethod
+    def key(url: str, vary: tuple = ()) -> str:
+        return hashlib.sha256("\n".join(["GET " + url, *vary]).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.gz"
+
+    def _read(self, key: str) -> Optional[tuple[dict, bytes]]:
+        path = self._path(key)
+        try:
+            data = gzip.decompress(path.read_bytes())
+            os.utime(path)  # least recently used goes first
+        except (OSError, EOFError):
+            return None
+        header, _, body = data.partition(b"\n")
+        try:
+            meta = json.loads(header)
+        except ValueError:
+            return None
+        return (meta, body) if meta.get("version") == FORMAT_VERSION else None
+
+    def _write(self, key: str, meta: dict, body: bytes = b""):
+        meta = {"version": FORMAT_VERSION, **meta}
+        data = gzip.compress(json.dumps(meta).encode("utf-8") + b"\n" + body, mtime=0)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        with self._lock:
+            old = path.stat().st_size if path.exists() else 0
+            os.replace(tmp, path)
+            if self._size is None:
+                self._size = sum(p.stat().st_size for p in self.root.glob("*/*.gz"))
+            else:
+                self._size += len(data) - old
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries down to 90% of max_bytes."""
+        entries = []
+        for path in self.root.glob("*/*.gz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+            self.evicted += 1
+
+    def lookup(self, request: requests.PreparedRequest) -> tuple[Optional[str], Optional[dict], bytes]:
+        """
+        Find the stored response for a request.
+        Returns (entry key, metadata or None, body); the key is None when
+        the request must not use the cache at all.
+        """
+        if request.method != "GET" or "Authorization" in request.headers:
+            return None, None, b""
+        if "no-store" in parse_cache_control(request.headers.get("Cache-Control")):
+            return None, None, b""
+        key = self.key(request.url)
+        found = self._read(key)
+        if found and "vary" in found[0]:
+            key = self.key(request.url, self._vary_values(request, found[0]["vary"]))
+            found = self._read(key)
+        return key, *(found or (None, b""))
+
+    @staticmethod
+    def _vary_values(request: requests.PreparedRequest, names: list) -> tuple:
+        return tuple(f"{name.lower()}: {request.headers.get(name, '')}" for name in names)
+
+    def is_fresh(self, meta: dict, request: requests.PreparedRequest) -> bool:
+        request_directives = parse_cache_control(request.headers.get("Cache-Control"))
+        if "no-cache" in request_directives:
+            return False
+        headers = requests.structures.CaseInsensitiveDict(meta["headers"])
+        lifetime = freshness_lifetime(headers, self.ttl)
+        max_age = _seconds(request_directives.get("max-age"))
+        if max_age is not None:
+            lifetime = min(lifetime, max_age)
+        age = (_seconds(headers.get("Age")) or 0) + max(0.0, time.time() - meta["stored_at"])
+        return age < lifetime
+
+    def store(self, request: requests.PreparedRequest, response: requests.Response,
+              body: bytes) -> bool:
+        """Store a response if it is cacheable. Returns whether it was stored."""
+        if response.status_code not in CACHEABLE_STATUSES:
+            return False
+        if "no-store" in parse_cache_control(response.headers.get("Cache-Control")):
+            return False
+        vary = [name.strip() for name in response.headers.get("Vary", "").split(",") if name.strip()]
+        if "*" in vary:
+            return False
+        meta = {
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: v for k, v in response.headers.items()
+                        if k.lower() not in DROPPED_HEADERS},
+            "stored_at": time.time(),
+        }
+        key = self.key(request.url)
+        if vary:
+            self._write(key, {"vary": vary, "stored_at": meta["stored_at"]})
+            key = self.key(request.url, self._vary_values(request, vary))
+        self._write(key, meta, body)
+        return True
+
+    def refresh(self, key: str, meta: dict, body: bytes, not_modified: requests.Response) -> dict:
+        """Update a stored response from a 304 (RFC 7234 section 4.3.4)."""
+        headers = dict(meta["headers"])
+        for name, value in not_modified.headers.items():
+            if name.lower() not in NOT_MODIFIED_SKIP:
+                headers[name] = value
+        meta = {**meta, "headers": headers, "stored_at": time.time()}
+        self._write(key, meta, body)
+        return meta
+
+
+def not_modified_for(request: requests.PreparedRequest, meta: dict) -> bool:
+    """True if a request's own validators match a stored 200 response."""
+    if meta["status"] != 200:
+        return False
+    headers = requests.structures.CaseInsensitiveDict(meta["headers"])
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return "*" in _etags(if_none_match) or bool(_etags(if_none_match) & _etags(headers.get("ETag")))
+    since = _http_date(request.headers.get("If-Modified-Since"))
+    modified = _http_date(headers.get("Last-Modified"))
+    return since is not None and modified is not None and modified <= since
+
+
+class CachingAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter that answers from an HTTPCache before asking ``inner``."""
+
+    CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+    def __init__(self, inner: requests.adapters.BaseAdapter, cache: HTTPCache):
+        super().__init__()
+        self.inner = inner
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        key, meta, body = self.cache.lookup(request)
+        if key is None:
+            return self.inner.send(request, **kwargs)
+        if meta is not None and self.cache.is_fresh(meta, request):
+            self.cache.count("hits")
+            if not_modified_for(request, meta):
+                return self._response(request, {**meta, "status": 304, "reason": "Not Modified"},
+                                      b"", "HIT")
+            return self._response(request, meta, body, "HIT")
+
+        # Stale: revalidate with the stored validators, unless the caller sent its own
+        caller_conditional = any(h in request.headers for h in self.CONDITIONAL_HEADERS)
+        if meta is not None and not caller_conditional:
+            request = request.copy()
+            stored = requests.structures.CaseInsensitiveDict(meta["headers"])
+            if stored.get("ETag"):
+                request.headers["If-None-Match"] = stored["ETag"]
+            if stored.get("Last-Modified"):
+                request.headers["If-Modified-Since"] = stored["Last-Modified"]
+
+        response = self.inner.send(request, **kwargs)
+        if response.status_code == 304 and meta is not None:
+            stored_etag = requests.structures.CaseInsensitiveDict(meta["headers"]).get("ETag")
+            if response.headers.get("ETag") in (None, stored_etag):
+                self.cache.count("revalidated")
+                meta = self.cache.refresh(key, meta, body, response)
+                if not caller_conditional:
+                    response.close()
+                    return self._response(request, meta, body, "REVALIDATED")
+            return response
+
+        self.cache.count("misses")
+        if response.status_code in CACHEABLE_STATUSES:
+            content = response.content  # read in full so the body can be stored
+            self.cache.store(request, response, content)
+        return response
+
+    def _response(self, request, meta: dict, body: bytes, source: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = meta["status"]
+        response.reason = meta.get("reason") or ""
+        response.headers = requests.structures.CaseInsensitiveDict(meta["headers"])
+        response.headers[CACHE_STATUS_HEADER] = source
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        self.inner.close()
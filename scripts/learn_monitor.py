@@ -8,6 +8,19 @@ deprecations, and maps changes to affected controls and playbooks.
 
 Usage:
     python scripts/learn_monitor.py [--dry-run] [--limit N] [--verbose] [--debug]
+                                    [--workers N] [--rate R] [--per-host N]
+                                    [--transport {requests,httpx}] [--pool-size N]
+                                    [--keepalive SECONDS]
+                                    [--state-backend {json,sqlite}]
+                                    [--time-budget DURATION] [--restart]
+                                    [--processes N] [--head-probe]
+                                    [--record DIR | --replay DIR]
+                                    [--http-cache] [--cache-ttl DURATION]
+                                    [--extractor {auto,lxml,bs4}]
+                                    [--simhash-distance BITS] [--diff URL]
+                                    [--schedule] [--max-requests N]
+                                    [--shard I/N | --merge-shards] [--shard-dir DIR]
+                                    [--apply-redirects] [--metrics-textfile PATH]
 
 Exit Codes:
     0 - No meaningful changes detected
@@ -18,17 +31,33 @@ Environment Variables:
     LEARN_MONITOR_DEBUG=1  - Enable debug output
 """
 
+import bisect
 import difflib
+import email.message
+import gzip
 import hashlib
+import importlib.util
+import html as html_lib
+import io
+import itertools
 import json
 import logging
 import os
 import re
+import shutil
+import sqlite3
+import ssl
+import string
 import sys
+import threading
 import time
 import traceback
-from dataclasses import dataclass, field
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, replace
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse
@@ -74,6 +103,21 @@ except ImportError as e:
     print(f"  sys.path: {sys.path[:3]}...")
     sys.exit(2)
 
+try:
+    # Optional: faster extraction backend (see extract_page)
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+try:
+    # Optional: HTTP/2 transport (--transport httpx; HTTP/2 also needs h2)
+    import httpx
+except ImportError:
+    httpx = None
+
+from docs_link_index import DocsLinkCache  # noqa: E402  (scripts/ is on sys.path)
+from http_cache import CACHE_STATUS_HEADER, DEFAULT_TTL, CachingAdapter, HTTPCache  # noqa: E402
+
 # === Configuration ===
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
@@ -81,11 +125,73 @@ DOCS_DIR = PROJECT_ROOT / "docs"
 
 WATCHLIST_PATH = DOCS_DIR / "reference" / "microsoft-learn-urls.md"
 STATE_FILE_PATH = PROJECT_ROOT / "data" / "learn-monitor-state.json"
+WATCHLIST_MANIFEST_PATH = PROJECT_ROOT / "data" / "learn-watchlist-manifest.json"
+SNAPSHOT_DIR = PROJECT_ROOT / "data" / "learn-monitor-snapshots"
+STATE_DB_PATH = PROJECT_ROOT / "data" / "learn-monitor-state.db"
+BOILERPLATE_PATH = PROJECT_ROOT / "data" / "learn-monitor-boilerplate.json"
 REPORTS_DIR = PROJECT_ROOT / "reports" / "learn-changes"
 
 REQUEST_TIMEOUT = 30  # seconds
-REQUEST_DELAY = 1.0   # seconds between requests
 MAX_RETRIES = 3
+MAX_WORKERS = 4             # fetches kept in flight
+REQUESTS_PER_SECOND = 2.0   # shared token-bucket refill rate (0 = unlimited)
+REQUEST_BURST = 4           # token-bucket capacity
+MAX_PER_HOST = 4            # concurrent requests against a single host
+TRANSPORTS = ("requests", "httpx")  # httpx = HTTP/2 multiplexing when h2 is installed
+KEEPALIVE_EXPIRY = 30.0     # seconds an idle pooled connection is kept (httpx transport)
+ANALYSIS_PROCESSES = min(4, os.cpu_count() or 1)  # extract/hash/classify workers
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}   # halve concurrency and honor Retry-After
+DEFAULT_RETRY_AFTER = 60         # seconds, for a 429 without Retry-After
+CIRCUIT_BREAKER_THRESHOLD = 8    # consecutive failed requests before giving up on a host
+CIRCUIT_MAX_RETRY_AFTER = 300    # a longer Retry-After opens the circuit immediately
+READ_CHUNK_SIZE = 16 * 1024
+# Learn <head> metadata that moves whenever the article is republished
+HEAD_META_FIELDS = ("ms.date", "updated_at", "git_commit_id", "gitcommit")
+PREVIOUS_CONTENT_FIELDS = ("content_hash", "snapshot_hash", "blocks", "boilerplate", "simhash",
+                           "normalized_content")
+BLOCK_HASH_LENGTH = 16           # hex digits kept per section hash in state
+PAGE_START_SECTION = "(before first heading)"
+BOILERPLATE_THRESHOLD = 0.5      # lines on more than this share of pages are page chrome
+BOILERPLATE_MIN_PAGES = 20       # don't learn a model from fewer pages than this
+# Shorter lines ("Note", "Add", "or") are also page content: they are learned and
+# stripped only before the first or after the last line at least this long
+BOILERPLATE_MIN_LINE_LENGTH = 20
+DIFF_MAX_LINES = 100             # diff lines kept per change
+HISTOGRAM_MAX_CHAIN = 256        # lines repeated more often are not used as diff anchors
+SIMHASH_DISTANCE = 3             # changes within this many SimHash bits are noise (0 = off)
+# --schedule: revisit each URL about this many times per expected change
+SCHEDULE_CHECKS_PER_CHANGE = 8
+SCHEDULE_PRIOR_DAYS = 30         # change-rate prior: one change per 30 days until observed
+SCHEDULE_MIN_INTERVAL = 1.0      # days
+SCHEDULE_MAX_INTERVAL = 14.0     # days
+SCHEDULE_CRITICAL_MAX_INTERVAL = 3.0  # days, for URLs cited by portal walkthroughs
+REDIRECT_REVALIDATE_DAYS = 7     # re-request the watchlist URL of a remembered redirect
+SHARD_DIR = PROJECT_ROOT / "data" / "learn-monitor-shards"  # --shard outputs, read by --merge-shards
+# Upper bounds of the per-run metrics histograms (Prometheus "le" buckets)
+METRIC_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # seconds
+METRIC_SIZE_BUCKETS = (4096, 16384, 65536, 262144, 1048576, 4194304)  # bytes
+METRIC_SLOWEST_PAGES = 5         # slowest fetches listed in state["metrics"]
+EXTRACTORS = ("auto", "lxml", "bs4")  # auto = lxml when installed, else BeautifulSoup
+USER_AGENT = "FSI-AgentGov-Monitor/1.0 (+https://github.com/judeper/FSI-AgentGov)"
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration such as ``90``, ``45s``, ``10m`` or ``1h`` into seconds."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*", value.lower())
+    if not match:
+        raise ValueError(f"invalid duration: {value!r}")
+    amount, unit = match.groups()
+    return float(amount) * {"": 1, "s": 1, "m": 60, "h": 3600}[unit]
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse a ``--shard`` value such as ``2/8`` into (index, count), 1-based."""
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", value)
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise ValueError(f"invalid shard: {value!r}")
+    return int(match.group(1)), int(match.group(2))
+
 
 # === Data Classes ===
 @dataclass
@@ -93,6 +199,8 @@ class URLEntry:
     url: str
     topic: str
     section: str
+    listings: list = field(default_factory=list)  # [topic, section] per watchlist row
+    aliases: list = field(default_factory=list)   # other watchlist spellings of url
 
 
 @dataclass
@@ -106,6 +214,28 @@ class ChangeRecord:
     affected_controls: list = field(default_factory=list)
     affected_playbooks: list = field(default_factory=list)
     priority: str = "MEDIUM"  # CRITICAL, HIGH, MEDIUM, LOW
+    changed_sections: list = field(default_factory=list)
+    categories: dict = field(default_factory=dict)
+    near_duplicate: Optional[int] = None  # SimHash distance; noise, not diffed
+
+
+@dataclass
+class PageAnalysis:
+    normalized: str
+    content_hash: str
+    blocks: list = field(default_factory=list)  # [heading, line_count, hash] per section
+    snapshot_text: Optional[str] = None     # text before boilerplate stripping, if it differs
+    snapshot_hash: Optional[str] = None
+    boilerplate: Optional[str] = None       # fingerprint of the model applied
+    simhash: Optional[str] = None           # set when the hash moved or none was stored
+    classification: Optional[str] = None   # set only when the hash moved
+    reason: str = ""
+    diff_text: str = ""
+    categories: dict = field(default_factory=dict)   # matched reason -> hit count
+    changed_sections: list = field(default_factory=list)
+    missing_previous: bool = False          # no old snapshot to diff against
+    near_duplicate: Optional[int] = None    # SimHash distance, when labeled noise without a diff
+    timings: dict = field(default_factory=dict)  # extract/hash/classify -> seconds
 
 
 @dataclass
@@ -116,17 +246,33 @@ class FetchResult:
     final_url: str
     was_redirected: bool
     error: Optional[str] = None
+    not_modified: bool = False          # server answered 304 to a conditional GET
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_digest: Optional[str] = None   # SHA-256 of the raw response body
+    deferred: bool = False              # not attempted/finished; retry next run
+    head_meta: Optional[dict] = None    # HEAD_META_FIELDS found in <head>
+    from_cache: Optional[str] = None    # --http-cache: HIT or REVALIDATED
+    http_version: Optional[str] = None  # protocol of the final response
+    wire_bytes: int = 0                 # body bytes received, before Content-Encoding decoding
+    decoded_bytes: int = 0              # body bytes after decoding
+    head_unchanged: bool = False        # head probe matched state; body not read
+    remembered: bool = False            # fetched a remembered redirect's final_url directly
+    timings: dict = field(default_factory=dict)  # connect/ttfb/download -> seconds
 
 
 # === Watchlist Parsing ===
+MANIFEST_VERSION = 1
+
+
 def parse_watchlist(watchlist_path: Path) -> list[URLEntry]:
     """
-    Extract Microsoft Learn URLs from microsoft-learn-urls.md.
-    Skips Admin Portals and Regulatory References sections.
+    Extract Microsoft Learn URLs from microsoft-learn-urls.md, one entry
+    per table row as written. Skips Admin Portals and Regulatory References
+    sections. See load_watchlist for the deduplicated list the monitor checks.
     """
     content = watchlist_path.read_text(encoding='utf-8')
     urls = []
-    current_section = "Unknown"
 
     # Sections to skip (not Learn URLs)
     skip_sections = [
@@ -144,20 +290,17 @@ def parse_watchlist(watchlist_path: Path) -> list[URLEntry]:
         re.MULTILINE
     )
 
-    # Track sections by position
+    # Track sections by position (ascending, so each row is a binary search)
     sections = [(m.start(), m.group(1).strip()) for m in section_pattern.finditer(content)]
+    section_starts = [pos for pos, _ in sections]
 
     for match in row_pattern.finditer(content):
         topic = match.group(1).strip().replace('**', '')
         url = match.group(2).strip()
 
-        # Find which section this URL is in
-        pos = match.start()
-        section = "Unknown"
-        for sec_pos, sec_name in reversed(sections):
-            if pos > sec_pos:
-                section = sec_name
-                break
+        # Find which section this URL is in: the last header before it
+        index = bisect.bisect_left(section_starts, match.start()) - 1
+        section = sections[index][1] if index >= 0 else "Unknown"
 
         # Skip non-Learn sections
         if any(skip in section for skip in skip_sections):
@@ -168,29 +311,657 @@ def parse_watchlist(watchlist_path: Path) -> list[URLEntry]:
     return urls
 
 
+def canonical_learn_url(url: str) -> str:
+    """
+    The one URL fetched for every watchlist spelling of a Learn page: https,
+    the en-us locale (the classifier's patterns are English), lowercase
+    path, and no query, fragment or trailing slash.
+    """
+    host, _, path = normalize_learn_url(url).partition("/")
+    return f"https://{host}/en-us/{path}".rstrip("/")
+
+
+def compile_watchlist(rows: list[URLEntry]) -> list[URLEntry]:
+    """
+    Merge watchlist rows that name the same page (see canonical_learn_url)
+    into one entry per page, in first-listed order. The first row gives the
+    entry's topic and section; every row is kept in ``listings``.
+    """
+    entries: dict[str, URLEntry] = {}
+    for row in rows:
+        url = canonical_learn_url(row.url)
+        entry = entries.get(url)
+        if entry is None:
+            entry = entries[url] = URLEntry(url=url, topic=row.topic, section=row.section)
+        if [row.topic, row.section] not in entry.listings:
+            entry.listings.append([row.topic, row.section])
+        if row.url != url and row.url not in entry.aliases:
+            entry.aliases.append(row.url)
+    return list(entries.values())
+
+
+def load_watchlist(watchlist_path: Path,
+                   manifest_path: Optional[Path] = WATCHLIST_MANIFEST_PATH) -> list[URLEntry]:
+    """
+    The deduplicated watchlist: one canonical URL per Learn page.
+    Compiled from the markdown and cached as a manifest keyed by the file's
+    SHA-256, so an unchanged watchlist is not re-parsed.
+    """
+    digest = hashlib.sha256(watchlist_path.read_bytes()).hexdigest()
+    if manifest_path is not None and manifest_path.exists():
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if (manifest.get("version") == MANIFEST_VERSION
+                    and manifest.get("source_sha256") == digest):
+                return [URLEntry(**entry) for entry in manifest["entries"]]
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+
+    entries = compile_watchlist(parse_watchlist(watchlist_path))
+    if manifest_path is not None:
+        try:
+            manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            manifest_path.write_text(json.dumps({
+                "version": MANIFEST_VERSION,
+                "source_sha256": digest,
+                "entries": [asdict(entry) for entry in entries],
+            }, indent=1, ensure_ascii=False), encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Could not save watchlist manifest: {e}")
+    return entries
+
+
+def migrate_state_keys(state: dict, entries: list[URLEntry]) -> int:
+    """
+    Re-key state written under watchlist spellings to the canonical URLs.
+    When several spellings have state, the canonical URL's own (or the
+    first listed) is kept. Returns count of spellings folded in.
+    """
+    moved = 0
+    for entry in entries:
+        for alias in entry.aliases:
+            url_state = state["urls"].pop(alias, None)
+            if url_state is None:
+                continue
+            state["urls"].setdefault(entry.url, url_state)
+            moved += 1
+    return moved
+
+
+# === Rate Limiting ===
+class TokenBucket:
+    """Thread-safe token bucket shared by every fetch worker."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class FetchDeferred(Exception):
+    """A fetch that should be retried on the next run rather than reported as an error."""
+
+
+@dataclass
+class RequestOutcome:
+    status: Optional[int] = None        # None = no response (connection error)
+    retry_after: Optional[float] = None
+
+
+class HostThrottle:
+    """
+    Run-wide adaptive throttle for one host (AIMD).
+    Each success widens the concurrency window by 1/window; a 429 or 503
+    halves it and pauses every queued request to the host for Retry-After.
+    After CIRCUIT_BREAKER_THRESHOLD consecutive failures, or a Retry-After
+    longer than CIRCUIT_MAX_RETRY_AFTER, the circuit opens and all further
+    requests to the host are deferred.
+    """
+
+    def __init__(self, host: str, max_concurrency: int):
+        self.host = host
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.consecutive_failures = 0
+        self.throttled = 0
+        self.circuit_open = False
+        self._cond = threading.Condition()
+
+    def acquire(self, deadline: Optional[float] = None):
+        """Wait for a request slot; raises FetchDeferred if none will come in time."""
+        with self._cond:
+            while True:
+                if self.circuit_open:
+                    raise FetchDeferred(f"Circuit open: {self.host} is throttling or failing")
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    raise FetchDeferred("Time budget exhausted")
+                if self.blocked_until > now:
+                    if deadline is not None and self.blocked_until > deadline:
+                        raise FetchDeferred(f"{self.host} rate limited beyond time budget")
+                    self._cond.wait(self.blocked_until - now)
+                elif self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                else:
+                    self._cond.wait(1.0)
+
+    def release(self, outcome: RequestOutcome):
+        """Return a slot and adapt the window to the request's outcome."""
+        with self._cond:
+            self.in_flight -= 1
+            status = outcome.status
+            if status is not None and status not in RETRYABLE_STATUSES and status < 500:
+                self.consecutive_failures = 0
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            else:
+                self.consecutive_failures += 1
+                if status in THROTTLE_STATUSES:
+                    self.throttled += 1
+                    self.limit = max(1.0, self.limit / 2)
+                    logger.info(f"{self.host} returned {status}; "
+                                f"concurrency reduced to {int(self.limit)}")
+                    wait = outcome.retry_after
+                    if wait and wait > CIRCUIT_MAX_RETRY_AFTER:
+                        self._open_circuit(f"Retry-After {wait:.0f}s")
+                    elif wait:
+                        if time.monotonic() + wait > self.blocked_until:
+                            print(f"  Rate limited, pausing requests to {self.host} for {wait:.0f}s...")
+                        self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+                if self.consecutive_failures >= CIRCUIT_BREAKER_THRESHOLD:
+                    self._open_circuit(f"{self.consecutive_failures} consecutive failures")
+            self._cond.notify_all()
+
+    def _open_circuit(self, reason: str):
+        if not self.circuit_open:
+            print(f"  WARNING: Circuit opened for {self.host} ({reason}); "
+                  "remaining URLs will be deferred")
+            self.circuit_open = True
+
+
+class FetchLimiter:
+    """Shared token bucket plus an adaptive throttle per host."""
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND, burst: int = REQUEST_BURST,
+                 per_host: int = MAX_PER_HOST):
+        self.bucket = TokenBucket(rate, burst)
+        self.per_host = max(1, per_host)
+        self._hosts: dict[str, HostThrottle] = {}
+        self._lock = threading.Lock()
+
+    def throttle(self, url: str) -> HostThrottle:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = HostThrottle(host, self.per_host)
+            return self._hosts[host]
+
+    @property
+    def circuit_open(self) -> bool:
+        return any(h.circuit_open for h in self._hosts.values())
+
+    @property
+    def throttled(self) -> int:
+        return sum(h.throttled for h in self._hosts.values())
+
+    @contextmanager
+    def slot(self, url: str, deadline: Optional[float] = None):
+        """
+        Hold a host slot and one rate token for the duration of a request.
+        The caller fills in the yielded RequestOutcome so the throttle can adapt.
+        """
+        throttle = self.throttle(url)
+        throttle.acquire(deadline)
+        outcome = RequestOutcome()
+        try:
+            self.bucket.acquire()
+            yield outcome
+        finally:
+            throttle.release(outcome)
+
+
+# === Record / Replay ===
+class CassetteMiss(requests.RequestException):
+    """A replayed request that was never recorded (not worth retrying)."""
+
+
+class Cassette:
+    """
+    On-disk record of HTTP exchanges for offline, deterministic runs.
+    ``index.json`` maps "METHOD URL" (plus any conditional headers) to the
+    status, reason, headers and final URL of each response; decoded bodies
+    are gzip-compressed under ``bodies/`` and shared when identical.
+    Redirects are recorded hop by hop, as the session follows them.
+    """
+
+    CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+    # Bodies are stored decoded, so transfer framing no longer applies
+    DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.index_path = root / "index.json"
+        self._lock = threading.Lock()
+        self.interactions: dict[str, dict] = {}
+        if self.index_path.exists():
+            self.interactions = json.loads(self.index_path.read_text(encoding="utf-8"))["interactions"]
+
+    @classmethod
+    def key(cls, request: requests.PreparedRequest, conditional: bool = True) -> str:
+        parts = [request.method or "GET", request.url or ""]
+        if conditional:
+            parts += [f"{h}: {request.headers[h]}" for h in cls.CONDITIONAL_HEADERS
+                      if request.headers.get(h)]
+        return " ".join(parts)
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response, body: bytes):
+        digest = hashlib.sha256(body).hexdigest()
+        body_path = self.root / "bodies" / f"{digest}.gz"
+        with self._lock:
+            if body and not body_path.exists():
+                body_path.parent.mkdir(parents=True, exist_ok=True)
+                body_path.write_bytes(gzip.compress(body, mtime=0))
+            self.interactions[self.key(request)] = {
+                "status": response.status_code,
+                "reason": response.reason,
+                "url": response.url,
+                "headers": {k: v for k, v in response.headers.items()
+                            if k.lower() not in self.DROPPED_HEADERS},
+                "body": digest if body else None,
+            }
+
+    def lookup(self, request: requests.PreparedRequest) -> Optional[dict]:
+        """Find a recorded response; an unconditional recording also answers a conditional GET."""
+        return (self.interactions.get(self.key(request))
+                or self.interactions.get(self.key(request, conditional=False)))
+
+    def body(self, interaction: dict) -> bytes:
+        if not interaction.get("body"):
+            return b""
+        return gzip.decompress((self.root / "bodies" / f"{interaction['body']}.gz").read_bytes())
+
+    def save(self):
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps({"version": 1, "interactions": self.interactions},
+                                           indent=1, sort_keys=True, ensure_ascii=False),
+                                encoding="utf-8")
+            os.replace(tmp_path, self.index_path)
+
+
+class RecordingAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter that records every exchange sent through ``inner``."""
+
+    def __init__(self, inner: requests.adapters.BaseAdapter, cassette: Cassette):
+        super().__init__()
+        self.inner = inner
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        response = self.inner.send(request, **kwargs)
+        self.cassette.record(request, response, response.content)
+        return response
+
+    def close(self):
+        self.inner.close()
+        self.cassette.save()
+
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter that serves responses from a cassette, with no network."""
+
+    def __init__(self, cassette: Cassette):
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        interaction = self.cassette.lookup(request)
+        if interaction is None:
+            raise CassetteMiss(f"Not in cassette: {request.method} {request.url}",
+                               request=request)
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.reason = interaction.get("reason") or ""
+        response.headers = requests.structures.CaseInsensitiveDict(interaction["headers"])
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(self.cassette.body(interaction))
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
 # === Content Fetching ===
-def fetch_page(url: str, session: requests.Session) -> FetchResult:
-    """Fetch a page with retry logic and redirect tracking."""
-    for attempt in range(MAX_RETRIES):
+class _HTTPXBody:
+    """File-like view of an httpx response's decoded body, for ``requests.Response.raw``."""
+
+    def __init__(self, response, connect_seconds: Optional[float] = None):
+        self.response = response
+        self.connect_seconds = connect_seconds  # None when a pooled connection was reused
+        self.version = 20 if response.http_version == "HTTP/2" else 11
+        self._chunks = response.iter_bytes()
+        self._buffer = b""
+        # Where requests' cookie handling reads Set-Cookie headers from (as on urllib3's response)
+        self.msg = email.message.Message()
+        for value in response.headers.get_list("set-cookie"):
+            self.msg["Set-Cookie"] = value
+        self._original_response = self
+
+    def read(self, amt: Optional[int] = None) -> bytes:
         try:
-            response = session.get(url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+            while amt is None or len(self._buffer) < amt:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer += chunk
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(e) from e
+        if amt is None:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
 
-            if response.status_code == 429:
-                wait_time = int(response.headers.get("Retry-After", 60))
-                print(f"  Rate limited, waiting {wait_time}s...")
-                time.sleep(wait_time)
-                continue
+    def tell(self) -> int:
+        """Bytes received so far, before decoding (as urllib3's ``tell``)."""
+        return self.response.num_bytes_downloaded
+
+    def close(self):
+        self.response.close()
+
+
+class HTTPXAdapter(requests.adapters.BaseAdapter):
+    """
+    Transport adapter that sends requests through pooled httpx clients.
+    With h2 installed, requests to a host are multiplexed over HTTP/2 on a
+    few connections instead of one TLS connection per worker. Redirects
+    are still followed by the requests session, and the session's
+    ``verify``, ``cert`` and proxy settings (including HTTPS_PROXY and
+    REQUESTS_CA_BUNDLE, which requests resolves) apply as they do on the
+    default transport: one client is kept per distinct combination.
+    """
+
+    def __init__(self, pool_size: int = MAX_WORKERS, keepalive: float = KEEPALIVE_EXPIRY):
+        super().__init__()
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                                   keepalive_expiry=keepalive)
+        self.clients: dict[tuple, httpx.Client] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ssl_context(verify, cert):
+        """httpx ``verify`` value for requests' ``verify`` (bool or CA path) and ``cert``."""
+        if verify is True and not cert:
+            return True
+        if verify is False:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        else:
+            ca = requests.utils.DEFAULT_CA_BUNDLE_PATH if verify is True else verify
+            context = ssl.create_default_context(
+                **({"capath": ca} if os.path.isdir(ca) else {"cafile": ca}))
+        if cert:
+            context.load_cert_chain(*(cert if isinstance(cert, tuple) else (cert,)))
+        return context
+
+    def client(self, verify=True, cert=None, proxy: Optional[str] = None) -> httpx.Client:
+        key = (verify, cert, proxy)
+        with self._lock:
+            if key not in self.clients:
+                self.clients[key] = httpx.Client(
+                    http2=importlib.util.find_spec("h2") is not None,
+                    limits=self.limits,
+                    verify=self._ssl_context(verify, cert),
+                    proxy=proxy,
+                    trust_env=False,  # requests has already applied the environment
+                    follow_redirects=False,
+                )
+            return self.clients[key]
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        cert = tuple(cert) if isinstance(cert, list) else cert
+        client = self.client(verify, cert, requests.utils.select_proxy(request.url, proxies))
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        connect: dict[str, float] = {}
+
+        def trace(event: str, info: dict):
+            # TCP connect (including the DNS lookup) and TLS handshake of a new connection
+            if event.startswith(("connection.connect_tcp.", "connection.start_tls.")):
+                connect.setdefault("started", time.perf_counter())
+                connect["complete"] = time.perf_counter()
+
+        try:
+            sent = client.build_request(request.method, request.url, headers=request.headers,
+                                        content=request.body, timeout=timeout,
+                                        extensions={"trace": trace})
+            reply = client.send(sent, stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e, request=request) from e
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(e, request=request) from e
+        response = requests.Response()
+        response.status_code = reply.status_code
+        response.reason = reply.reason_phrase
+        response.headers = requests.structures.CaseInsensitiveDict(reply.headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.raw = _HTTPXBody(reply, connect["complete"] - connect["started"] if connect else None)
+        requests.cookies.extract_cookies_to_jar(response.cookies, request, response.raw)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        if not stream:
+            response.content  # read now, as HTTPAdapter does without stream
+        return response
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+        self.clients.clear()
+
+
+def transfer_stats(response: requests.Response, body: bytes) -> dict:
+    """FetchResult transport fields for a response whose body is ``body``."""
+    raw = response.raw
+    version = getattr(raw, "version", None)
+    from_cache = response.headers.get(CACHE_STATUS_HEADER)
+    wire_bytes = 0  # served locally: nothing crossed the network
+    if not from_cache:
+        try:
+            wire_bytes = raw.tell()
+        except (AttributeError, ValueError):
+            # A closed in-memory body (cassette replay, 304, head probe)
+            wire_bytes = len(body) if version is None else 0
+    return {
+        "from_cache": from_cache,
+        "http_version": {10: "HTTP/1.0", 11: "HTTP/1.1", 20: "HTTP/2"}.get(version),
+        "wire_bytes": wire_bytes,
+        "decoded_bytes": len(body),
+    }
+
+
+def accept_encoding() -> str:
+    """Content codings to ask for: Brotli only when a decoder is installed."""
+    brotli = any(importlib.util.find_spec(name) for name in ("brotli", "brotlicffi"))
+    return "br, gzip" if brotli else "gzip, deflate"
+
+
+def create_session(workers: int = MAX_WORKERS, record: Optional[Path] = None,
+                   replay: Optional[Path] = None,
+                   cache: Optional[HTTPCache] = None, transport: str = "requests",
+                   pool_size: Optional[int] = None,
+                   keepalive: float = KEEPALIVE_EXPIRY) -> requests.Session:
+    """
+    Create the HTTP session shared by all fetch workers.
+    ``record`` saves every exchange to a cassette directory; ``replay``
+    serves them back from one instead of the network. ``cache`` answers
+    repeat requests from the shared on-disk HTTP cache (a cassette still
+    records every response the session sees). ``transport`` "httpx" sends
+    requests through an httpx client instead of urllib3, multiplexed over
+    HTTP/2 when h2 is installed. ``pool_size`` (default: ``workers``)
+    bounds the pooled connections per host.
+    """
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    session.headers["Accept-Encoding"] = accept_encoding()
+    pool_size = max(pool_size or workers, 1)
+    if transport == "httpx":
+        adapter = HTTPXAdapter(pool_size=pool_size, keepalive=keepalive)
+    else:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    if cache:
+        adapter = CachingAdapter(adapter, cache)
+    if replay:
+        adapter = ReplayAdapter(Cassette(replay))
+    elif record:
+        adapter = RecordingAdapter(adapter, Cassette(record))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _deferred_result(url: str, reason: str) -> FetchResult:
+    return FetchResult(url=url, status_code=0, content="", final_url=url,
+                       was_redirected=False, error=reason, deferred=True)
+
+
+_META_TAG_RE = re.compile(rb"<meta\s[^>]*>", re.IGNORECASE)
+_META_ATTR_RE = re.compile(r"""([\w.:-]+)\s*=\s*("[^"]*"|'[^']*'|[^\s>]+)""")
+_HEAD_END_RE = re.compile(rb"</head\s*>", re.IGNORECASE)
+
+
+def parse_head_meta(head: bytes) -> dict:
+    """Extract HEAD_META_FIELDS from the <meta> tags of a page's <head>."""
+    meta = {}
+    for tag in _META_TAG_RE.findall(head):
+        attrs = {
+            k.lower(): html_lib.unescape(v.strip("\"'"))
+            for k, v in _META_ATTR_RE.findall(tag.decode("utf-8", errors="replace"))
+        }
+        name = (attrs.get("name") or attrs.get("property") or "").lower()
+        if name in HEAD_META_FIELDS and attrs.get("content"):
+            meta[name] = attrs["content"]
+    return meta
+
+
+def _read_page(response: requests.Response,
+               known_meta: Optional[dict] = None) -> tuple[bytes, dict, bool]:
+    """
+    Stream a response body, parsing <head> metadata on the way.
+    If ``known_meta`` is given and the head metadata matches it, stop after
+    ``</head>`` and close the response. Returns (bytes read, head metadata,
+    whether the full body was read).
+    """
+    chunks = response.iter_content(chunk_size=READ_CHUNK_SIZE)
+    head = bytearray()
+    for chunk in chunks:
+        start = max(0, len(head) - 16)
+        head += chunk
+        if _HEAD_END_RE.search(head, start):
+            break
+    meta = parse_head_meta(bytes(head))
+    if known_meta and meta and meta == known_meta:
+        response.close()
+        return bytes(head), meta, False
+    return bytes(head) + b"".join(chunks), meta, True
+
+
+def _decode_body(response: requests.Response, body: bytes) -> str:
+    """Decode a streamed body the same way ``requests.Response.text`` does."""
+    encoding = response.encoding
+    if encoding is None:
+        detector = getattr(requests.compat, "chardet", None)
+        encoding = detector.detect(body)["encoding"] if detector else None
+    try:
+        return str(body, encoding or "utf-8", errors="replace")
+    except (LookupError, TypeError):
+        return str(body, errors="replace")
 
-            return FetchResult(
-                url=url,
-                status_code=response.status_code,
-                content=response.text if response.status_code == 200 else "",
-                final_url=response.url,
-                was_redirected=response.url != url,
-            )
 
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return DEFAULT_RETRY_AFTER if response.status_code == 429 else None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+def fetch_page(url: str, session: requests.Session,
+               limiter: Optional[FetchLimiter] = None,
+               validators: Optional[dict] = None,
+               deadline: Optional[float] = None,
+               head_probe: bool = False) -> FetchResult:
+    """
+    Fetch a page with retry logic and redirect tracking.
+    When ``validators`` (a per-URL state record) carries an ETag or
+    Last-Modified value, the request is made conditional. A ``deadline``
+    (``time.monotonic()`` value) defers the URL instead of waiting past it.
+    429/5xx back-off is coordinated run-wide through ``limiter``.
+    With ``head_probe``, reading stops after ``</head>`` when the page's
+    metadata matches ``validators["head_meta"]``.
+    """
+    known_meta = (validators or {}).get("head_meta") if head_probe else None
+    limiter = limiter or FetchLimiter(rate=0)
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    def out_of_time(wait: float = 0) -> bool:
+        return deadline is not None and time.monotonic() + wait > deadline
+
+    last_status = 0
+    for attempt in range(MAX_RETRIES):
+        try:
+            with limiter.slot(url, deadline) as outcome:
+                sent = time.perf_counter()
+                response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT,
+                                       allow_redirects=True, stream=True)
+                headers_received = time.perf_counter()
+                outcome.status = response.status_code
+                outcome.retry_after = _retry_after(response)
+                if response.status_code == 200:
+                    body, head_meta, complete = _read_page(response, known_meta)
+                else:
+                    response.close()
+                read = time.perf_counter()
+        except FetchDeferred as e:
+            return _deferred_result(url, str(e))
         except requests.RequestException as e:
-            if attempt == MAX_RETRIES - 1:
+            if attempt == MAX_RETRIES - 1 or isinstance(e, CassetteMiss):
                 return FetchResult(
                     url=url,
                     status_code=0,
@@ -199,11 +970,51 @@ def fetch_page(url: str, session: requests.Session) -> FetchResult:
                     was_redirected=False,
                     error=str(e)
                 )
+            if out_of_time(2 ** attempt):
+                return _deferred_result(url, "Time budget exhausted")
             time.sleep(2 ** attempt)
+            continue
+
+        if response.status_code in RETRYABLE_STATUSES:
+            # With Retry-After the host throttle pauses the next attempt;
+            # otherwise back off locally.
+            last_status = response.status_code
+            if outcome.retry_after is None and attempt < MAX_RETRIES - 1:
+                if out_of_time(2 ** attempt):
+                    return _deferred_result(url, "Time budget exhausted")
+                time.sleep(2 ** attempt)
+            continue
 
+        ok = response.status_code == 200
+        full = ok and complete
+        # Time to first byte includes redirect hops and connection setup
+        timings = {"ttfb": headers_received - sent, "download": read - headers_received}
+        if getattr(response.raw, "connect_seconds", None) is not None:
+            timings["connect"] = response.raw.connect_seconds
+        return FetchResult(
+            url=url,
+            status_code=response.status_code,
+            content=_decode_body(response, body) if full else "",
+            final_url=response.url,
+            was_redirected=response.url != url,
+            not_modified=response.status_code == 304,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            body_digest=compute_body_digest(body) if full else None,
+            head_meta=head_meta if ok else None,
+            head_unchanged=ok and not complete,
+            timings=timings,
+            **transfer_stats(response, body if ok else b""),
+        )
+
+    if limiter.circuit_open:
+        return _deferred_result(url, "Circuit open: Learn is throttling or failing")
+    if last_status in THROTTLE_STATUSES:
+        # Throttled, not broken: retried next run like the URLs deferred after it
+        return _deferred_result(url, f"Throttled (HTTP {last_status}) on every retry")
     return FetchResult(
         url=url,
-        status_code=0,
+        status_code=last_status,
         content="",
         final_url=url,
         was_redirected=False,
@@ -211,34 +1022,264 @@ def fetch_page(url: str, session: requests.Session) -> FetchResult:
     )
 
 
+def unchanged_by_validators(result: FetchResult, url_state: dict) -> bool:
+    """
+    True if a 304, matching head metadata, or an identical raw body proves
+    the page did not change.
+    """
+    if url_state.get("content_hash") is None:
+        return False
+    return result.not_modified or result.head_unchanged or bool(
+        result.body_digest and result.body_digest == url_state.get("body_digest")
+    )
+
+
+def analyze_all(fetched, submit, window: int):
+    """
+    Second pipeline stage.
+    ``fetched`` yields (entry, FetchResult) in watchlist order and
+    ``submit(entry, result)`` returns a Future for the page's analysis, or
+    None when it needs none. Yields (entry, result, PageAnalysis or None) in
+    the same order. At most ``window`` pages are held, so a slow consumer
+    stops the fetch stage from pulling more work (backpressure).
+    """
+    pending: deque = deque()
+    try:
+        for entry, result in fetched:
+            pending.append((entry, result, submit(entry, result)))
+            while len(pending) >= max(1, window):
+                entry, result, future = pending.popleft()
+                yield entry, result, future.result() if future else None
+        while pending:
+            entry, result, future = pending.popleft()
+            yield entry, result, future.result() if future else None
+    finally:
+        for _, _, future in pending:
+            if future:
+                future.cancel()
+
+
+def fetch_all(entries: list[URLEntry], fetch, workers: int = MAX_WORKERS,
+              should_stop=None):
+    """
+    Fetch entries on a bounded worker pool.
+    Yields (entry, FetchResult) in watchlist order so that downstream
+    processing and reports stay deterministic. At most ``workers * 2``
+    fetches are queued ahead of the consumer. Once ``should_stop()`` returns
+    True no new fetches are started; in-flight ones are still yielded.
+    """
+    should_stop = should_stop or (lambda: False)
+    if workers <= 1:
+        for entry in entries:
+            if should_stop():
+                return
+            yield entry, fetch(entry)
+        return
+
+    remaining = iter(entries)
+    pending: deque = deque()
+
+    def submit(pool, count: int):
+        for entry in itertools.islice(remaining, count):
+            pending.append((entry, pool.submit(fetch, entry)))
+            if should_stop():
+                break
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as pool:
+        try:
+            if not should_stop():
+                submit(pool, workers * 2)
+            while pending:
+                entry, future = pending.popleft()
+                result = future.result()
+                if not should_stop():
+                    submit(pool, 1)
+                yield entry, result
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
 # === Content Extraction ===
-def extract_main_content(html: str) -> str:
-    """Extract and normalize main content from Learn page using BeautifulSoup."""
+# Dropped before extraction, with everything inside them
+REMOVED_TAGS = ('script', 'style', 'nav', 'header', 'footer', 'aside', 'noscript')
+# Learn page chrome (feedback, metadata sections)
+CHROME_CLASSES = ('feedback-section', 'metadata', 'contributors', 'page-metadata')
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+
+def extract_main_content(html: str, extractor: str = "auto") -> str:
+    """Extract and normalize main content from a Learn page."""
+    return extract_page(html, extractor)[0]
+
+
+def _normalize_text(text: str) -> str:
+    # The substring checks skip a regex pass that would change nothing
+    if '\n\n\n' in text:
+        text = re.sub(r'\n{3,}', '\n\n', text)  # Collapse blank lines
+    if '  ' in text or '\t' in text:
+        text = re.sub(r'[ \t]+', ' ', text)      # Collapse whitespace
+    text = re.sub(r'\d{1,2}/\d{1,2}/\d{4}', '[DATE]', text)  # Mask dates
+    return text.strip()
+
+
+def extract_page(html: str, extractor: str = "auto") -> tuple[str, list[str]]:
+    """
+    Extract normalized main content plus the first text line of each heading
+    (h1-h6), which compute_blocks uses as section boundaries.
+
+    ``extractor`` picks the parser: "lxml" (needs the optional lxml package)
+    or "bs4"; "auto" uses lxml when it is installed. Both produce the same
+    text, so content hashes don't depend on the backend. The lxml backend
+    hands any page it can't match BeautifulSoup on exactly to the bs4 one.
+    """
+    if extractor != "bs4" and lxml_etree is not None:
+        extracted = _extract_page_lxml(html)
+        if extracted is not None:
+            return extracted
+    return _extract_page_bs4(html)
+
+
+def _extract_page_bs4(html: str) -> tuple[str, list[str]]:
     soup = BeautifulSoup(html, 'html.parser')
 
     # Remove non-content elements
-    for tag in soup.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside', 'noscript']):
+    for tag in soup.find_all(list(REMOVED_TAGS)):
         tag.decompose()
 
     # Remove Learn page chrome (feedback, metadata sections)
-    for selector in ['.feedback-section', '.metadata', '.contributors', '.page-metadata']:
-        for elem in soup.select(selector):
+    for name in CHROME_CLASSES:
+        for elem in soup.select(f'.{name}'):
             elem.decompose()
 
     # Find main content area
     main = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
 
-    if main:
-        text = main.get_text(separator='\n', strip=True)
-    else:
-        text = soup.get_text(separator='\n', strip=True)
+    root = main or soup
+    text = root.get_text(separator='\n', strip=True)
+    headings = []
+    for heading in root.find_all(list(HEADING_TAGS)):
+        first = next(heading.stripped_strings, None)
+        if first:
+            headings.append(_normalize_text(first))
+
+    return _normalize_text(text), headings
+
+
+if lxml_etree is not None:
+    _LXML_PARSER = lxml_etree.HTMLParser()
+    _REMOVED_XPATH = ' or '.join(
+        [f'self::{tag}' for tag in REMOVED_TAGS]
+        + [f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+           for name in CHROME_CLASSES])
+    _KEPT = f'not(ancestor-or-self::*[{_REMOVED_XPATH}])'
+    # First <main>, else first <article>, that survives the removals. A
+    # page with neither goes to BeautifulSoup (its div.content/whole-page
+    # fallbacks are rare).
+    _LXML_ROOT = lxml_etree.XPath(f'(//main[{_KEPT}])[1] | (//article[{_KEPT}])[1]')
+    _LXML_CONTENTS = lxml_etree.XPath(f'node()[not(self::*[{_REMOVED_XPATH}])]')
+    # Elements whose own strings get_text() skips: the removed ones, and
+    # those BeautifulSoup files strings under as template or ruby text
+    _LXML_HIDDEN = lxml_etree.XPath(
+        f'.//*[{_REMOVED_XPATH} or self::template or self::rt or self::rp]')
+    _LXML_IN_HIDDEN = lxml_etree.XPath('boolean(ancestor::template | ancestor::rt | ancestor::rp)')
+    # End tags and self-closing tags, to spot elements closed implicitly
+    _CLOSE_TAG_RE = re.compile(r'</([a-z][a-z0-9-]*)|<([a-z][a-z0-9-]*)\b[^<>]*/>', re.IGNORECASE)
+    _VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+                            'meta', 'param', 'source', 'track', 'wbr', 'html', 'head', 'body'))
+    # libxml2 reads these as text; html.parser parses markup inside them
+    # (and, for all but title and textarea, decodes entities)
+    _LXML_RAW_TEXT = lxml_etree.XPath(
+        "//*[self::title or self::textarea][contains(., '<')]"
+        " | //*[self::iframe or self::xmp or self::noembed or self::noframes or self::plaintext]"
+        "[contains(., '<') or contains(., '&')]")
+
+
+def _lxml_implied_ends(doc, html: str) -> bool:
+    """
+    True if some element was closed without an end tag. libxml2 and
+    html.parser close those at different points (libxml2 ends a <p> at the
+    next block element, html.parser only at its parent's end tag).
+    """
+    opened = defaultdict(int)
+    for elem in doc.iter(tag=lxml_etree.Element):
+        opened[elem.tag] += 1
+    closed = defaultdict(int)
+    for match in _CLOSE_TAG_RE.finditer(html):
+        closed[(match.group(1) or match.group(2)).lower()] += 1
+    return any(count > closed[tag] for tag, count in opened.items() if tag not in _VOID_TAGS)
 
-    # Normalize
-    text = re.sub(r'\n{3,}', '\n\n', text)  # Collapse blank lines
-    text = re.sub(r'[ \t]+', ' ', text)      # Collapse whitespace
-    text = re.sub(r'\d{1,2}/\d{1,2}/\d{4}', '[DATE]', text)  # Mask dates
 
-    return text.strip()
+def _lxml_strings(elem):
+    return (s for s in (s.strip() for s in elem.itertext()) if s)
+
+
+def _extract_page_lxml(html: str) -> Optional[tuple[str, list[str]]]:
+    """
+    lxml version of _extract_page_bs4. Only the <main>/<article> subtree is
+    walked; chrome elsewhere on the page is never visited.
+
+    Returns None whenever the two parsers could build different trees, so
+    the caller falls back to BeautifulSoup: mis-nested or implicitly closed
+    tags, CR line endings (libxml2 folds them), CDATA sections (libxml2 drops
+    them) and markup inside raw-text elements.
+    """
+    if '\r' in html or '<![CDATA[' in html:
+        return None
+    try:
+        doc = lxml_etree.HTML(html, _LXML_PARSER)
+    except (lxml_etree.ParserError, ValueError):
+        return None
+    if doc is None or _LXML_RAW_TEXT(doc) or any(
+            e.type_name == 'ERR_TAG_NAME_MISMATCH' for e in _LXML_PARSER.error_log):
+        return None
+    if _lxml_implied_ends(doc, html):
+        return None
+    roots = _LXML_ROOT(doc)
+    if not roots:
+        return None
+    root = next((r for r in roots if r.tag == 'main'), roots[0])  # main wins over article
+    if not _LXML_CONTENTS(root) or _LXML_IN_HIDDEN(root):
+        return None  # empty once cleaned: BeautifulSoup moves on to the next candidate
+
+    # Emptied rather than deleted, so the text either side of a removed
+    # element stays two strings
+    for elem in _LXML_HIDDEN(root):
+        elem.clear(keep_tail=True)
+
+    text = '\n'.join(_lxml_strings(root))
+    headings = []
+    for heading in root.iter(*HEADING_TAGS):
+        first = next(_lxml_strings(heading), None)
+        if first:
+            headings.append(_normalize_text(first))
+
+    return _normalize_text(text), headings
+
+
+def compute_blocks(text: str, headings: list[str]) -> list:
+    """
+    Split normalized text into sections at heading lines and hash each one.
+    Returns ``[heading, line_count, hash]`` per section, in page order; the
+    line counts let the previous snapshot be split the same way later.
+    """
+    boundaries = set(headings)
+    blocks = []
+    heading, lines = PAGE_START_SECTION, []
+
+    def close():
+        digest = hashlib.sha256(''.join(lines).encode('utf-8')).hexdigest()
+        blocks.append([heading, len(lines), digest[:BLOCK_HASH_LENGTH]])
+
+    for line in text.splitlines(keepends=True):
+        if line.rstrip() in boundaries:
+            if lines:
+                close()
+            heading, lines = line.rstrip(), []
+        lines.append(line)
+    if lines:
+        close()
+    return blocks
 
 
 def compute_hash(content: str) -> str:
@@ -246,124 +1287,747 @@ def compute_hash(content: str) -> str:
     return f"sha256:{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
 
 
+_SIMHASH_PUNCTUATION = str.maketrans('', '', string.punctuation)
+# _SIMHASH_BITS[i] maps a byte to 1 if its bit i is set, else 0
+_SIMHASH_BITS = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+
+def compute_simhash(text: str) -> str:
+    """
+    64-bit SimHash of normalized text, as 16 hex digits. Each line is one
+    feature, case-folded with punctuation and spacing dropped, so cosmetic
+    edits leave the fingerprint as is and rewriting a few lines of a long
+    page moves it by only a few bits.
+    """
+    features = [' '.join(line.split())
+                for line in text.lower().translate(_SIMHASH_PUNCTUATION).split('\n')]
+    features = [f for f in features if f]
+    digests = b''.join([hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest()
+                        for f in features])
+    fingerprint = 0
+    # Bit n is set when more than half the feature hashes have it set;
+    # each byte position is sliced out and counted in C
+    for index in range(8):
+        column = digests[index::8]
+        for bit in range(8):
+            if 2 * column.translate(_SIMHASH_BITS[bit]).count(1) > len(features):
+                fingerprint |= 1 << (index * 8 + bit)
+    return f'{fingerprint:016x}'
+
+
+def simhash_distance(a: str, b: str) -> int:
+    """Number of differing bits between two compute_simhash fingerprints."""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def compute_body_digest(body: bytes) -> str:
+    """Compute SHA-256 digest of a raw response body."""
+    return f"sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+def _validator_fields(result: FetchResult, url_state: Optional[dict] = None) -> dict:
+    """
+    Cache validators to persist for a URL.
+    A 304 response may omit headers, so fall back to the stored values.
+    """
+    url_state = url_state or {}
+    fields = {
+        "etag": result.etag or url_state.get("etag"),
+        "last_modified": result.last_modified or url_state.get("last_modified"),
+        "body_digest": result.body_digest or url_state.get("body_digest"),
+        "head_meta": result.head_meta or url_state.get("head_meta"),
+    }
+    return {k: v for k, v in fields.items() if v}
+
+
+@dataclass
+class BoilerplateModel:
+    """
+    Lines that appear on most Learn pages ("Table of contents", "Ask Learn",
+    "Share via", ...), learned from the stored snapshots. They are stripped
+    from extracted text before hashing, so Learn UI changes don't register
+    as content changes. Lines shorter than BOILERPLATE_MIN_LINE_LENGTH
+    are kept in ``edge_lines``: they only count, and are only stripped,
+    outside the page's main content (see _content_bounds).
+    """
+    lines: dict = field(default_factory=dict)  # line -> pages it appeared on
+    edge_lines: dict = field(default_factory=dict)  # short line -> pages it began or ended
+    pages: int = 0
+    threshold: float = BOILERPLATE_THRESHOLD
+    built: str = ""
+
+    @classmethod
+    def build(cls, texts, threshold: float = BOILERPLATE_THRESHOLD) -> "BoilerplateModel":
+        """Learn the model from an iterable of extracted (unstripped) page texts."""
+        counts: dict[str, int] = defaultdict(int)
+        edge_counts: dict[str, int] = defaultdict(int)
+        pages = 0
+        for text in texts:
+            pages += 1
+            page_lines = text.split('\n')
+            for line in set(page_lines):
+                if len(line.strip()) >= BOILERPLATE_MIN_LINE_LENGTH:
+                    counts[line] += 1
+            first, end = _content_bounds(page_lines)
+            for line in set(page_lines[:first] + page_lines[end:]):
+                if line.strip() and len(line.strip()) < BOILERPLATE_MIN_LINE_LENGTH:
+                    edge_counts[line] += 1
+        lines, edge_lines = {}, {}
+        if pages >= BOILERPLATE_MIN_PAGES:
+            lines = {line: n for line, n in counts.items() if n / pages > threshold}
+            edge_lines = {line: n for line, n in edge_counts.items() if n / pages > threshold}
+
+        def by_count(found: dict) -> dict:
+            return dict(sorted(found.items(), key=lambda item: (-item[1], item[0])))
+
+        return cls(lines=by_count(lines), edge_lines=by_count(edge_lines),
+                   pages=pages, threshold=threshold,
+                   built=datetime.now(timezone.utc).isoformat())
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BoilerplateModel"]:
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(lines=data["lines"], edge_lines=data.get("edge_lines", {}),
+                   pages=data["pages"], threshold=data["threshold"], built=data.get("built", ""))
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": 2, "built": self.built, "pages": self.pages,
+                "threshold": self.threshold, "lines": self.lines, "edge_lines": self.edge_lines}
+        path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        if not self.lines and not self.edge_lines:
+            return None
+        key = '\n'.join(sorted(self.lines))
+        if self.edge_lines:
+            key += '\n\n' + '\n'.join(sorted(self.edge_lines))
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:BLOCK_HASH_LENGTH]
+
+    def strip(self, text: str) -> str:
+        if not self.lines and not self.edge_lines:
+            return text
+        page_lines = text.split('\n')
+        first, end = _content_bounds(page_lines)
+        return '\n'.join(
+            line for i, line in enumerate(page_lines)
+            if line not in self.lines
+            and not (line in self.edge_lines and not first <= i < end))
+
+
+def _content_bounds(page_lines: list[str]) -> tuple[int, int]:
+    """
+    (first, end) line indexes of a page's main content: from its first to
+    its last line of at least BOILERPLATE_MIN_LINE_LENGTH characters. The
+    short lines around it are page chrome ("Ask Learn", "Feedback", ...).
+    """
+    long = [i for i, line in enumerate(page_lines) if len(line.strip()) >= BOILERPLATE_MIN_LINE_LENGTH]
+    return (long[0], long[-1] + 1) if long else (len(page_lines), len(page_lines))
+
+
+# === Line Diff ===
+def _intern_lines(a: list[str], b: list[str]) -> tuple[list[int], list[int]]:
+    """Map each distinct line to a small integer so the diff compares ints."""
+    ids: dict[str, int] = {}
+    return ([ids.setdefault(line, len(ids)) for line in a],
+            [ids.setdefault(line, len(ids)) for line in b])
+
+
+def _histogram_anchor(a: list[int], alo: int, ahi: int,
+                      b: list[int], blo: int, bhi: int) -> Optional[tuple[int, int, int]]:
+    """
+    Histogram-diff step: return the longest matching run ``(i, j, size)``
+    through a line common to both ranges, preferring the rarer line on
+    ties. Lines repeated more than HISTOGRAM_MAX_CHAIN times in ``a`` (blank
+    table cells, "Note") never start a run, and ``b`` is scanned past each
+    run found, so the step stays close to linear.
+    """
+    positions: dict[int, list[int]] = defaultdict(list)
+    for i in range(alo, ahi):
+        positions[a[i]].append(i)
+
+    best = None  # (-size, occurrences, i, j, size)
+    j = blo
+    while j < bhi:
+        occurrences = positions.get(b[j])
+        if not occurrences or len(occurrences) > HISTOGRAM_MAX_CHAIN:
+            j += 1
+            continue
+        next_j = j + 1
+        for i in occurrences:
+            si, sj = i, j
+            while si > alo and sj > blo and a[si - 1] == b[sj - 1]:
+                si, sj = si - 1, sj - 1
+            ei, ej = i + 1, j + 1
+            while ei < ahi and ej < bhi and a[ei] == b[ej]:
+                ei, ej = ei + 1, ej + 1
+            candidate = (si - ei, len(occurrences), si, sj, ei - si)
+            if best is None or candidate < best:
+                best = candidate
+            next_j = max(next_j, ej)
+        j = next_j
+    return best[2:] if best else None
+
+
+def matching_blocks(a: list[int], b: list[int]) -> list[tuple[int, int, int]]:
+    """
+    Matching blocks ``(i, j, size)`` of two integer sequences, in the format
+    of ``SequenceMatcher.get_matching_blocks()`` (ending with a sentinel).
+    Uses histogram diff, falling back to SequenceMatcher (as difflib would
+    use it) only for ranges whose common lines are all heavily repeated.
+    """
+    found = []
+    ranges = [(0, len(a), 0, len(b))]
+    while ranges:
+        alo, ahi, blo, bhi = ranges.pop()
+        start = alo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo, blo = alo + 1, blo + 1
+        if alo > start:
+            found.append((start, blo - (alo - start), alo - start))
+        end = ahi
+        while ahi > alo and bhi > blo and a[ahi - 1] == b[bhi - 1]:
+            ahi, bhi = ahi - 1, bhi - 1
+        if end > ahi:
+            found.append((ahi, bhi, end - ahi))
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchor = _histogram_anchor(a, alo, ahi, b, blo, bhi)
+        if anchor is None:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi])
+            found.extend((alo + i, blo + j, size)
+                         for i, j, size in matcher.get_matching_blocks() if size)
+            continue
+        i, j, size = anchor
+        found.append(anchor)
+        ranges.append((alo, i, blo, j))
+        ranges.append((i + size, ahi, j + size, bhi))
+
+    # Merge adjacent blocks, as SequenceMatcher does
+    blocks = []
+    for i, j, size in sorted(found):
+        if blocks and blocks[-1][0] + blocks[-1][2] == i and blocks[-1][1] + blocks[-1][2] == j:
+            blocks[-1] = (blocks[-1][0], blocks[-1][1], blocks[-1][2] + size)
+        else:
+            blocks.append((i, j, size))
+    blocks.append((len(a), len(b), 0))
+    return blocks
+
+
+def _opcodes(blocks: list[tuple[int, int, int]]) -> list[tuple[str, int, int, int, int]]:
+    """Turn matching blocks into opcodes, as ``SequenceMatcher.get_opcodes()`` does."""
+    i = j = 0
+    opcodes = []
+    for ai, bj, size in blocks:
+        tag = ''
+        if i < ai and j < bj:
+            tag = 'replace'
+        elif i < ai:
+            tag = 'delete'
+        elif j < bj:
+            tag = 'insert'
+        if tag:
+            opcodes.append((tag, i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
+
+def _grouped_opcodes(codes: list[tuple], n: int = 3):
+    """Hunks with ``n`` lines of context, as ``SequenceMatcher.get_grouped_opcodes()``."""
+    if not codes:
+        codes = [('equal', 0, 1, 0, 1)]
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    nn = n + n
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > nn:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _format_range(start: int, stop: int) -> str:
+    beginning, length = start + 1, stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def unified_diff(a: list[str], b: list[str], n: int = 3):
+    """
+    Drop-in for ``difflib.unified_diff(a, b, lineterm='')``: same output
+    format, but lines are interned to integers and matched with histogram
+    diff. Lines are generated lazily, hunk by hunk.
+    """
+    a_ids, b_ids = _intern_lines(a, b)
+    started = False
+    for group in _grouped_opcodes(_opcodes(matching_blocks(a_ids, b_ids)), n):
+        if not started:
+            started = True
+            yield '--- '
+            yield '+++ '
+        first, last = group[0], group[-1]
+        yield f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@"
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                for line in a[i1:i2]:
+                    yield ' ' + line
+                continue
+            if tag in ('replace', 'delete'):
+                for line in a[i1:i2]:
+                    yield '-' + line
+            if tag in ('replace', 'insert'):
+                for line in b[j1:j2]:
+                    yield '+' + line
+
+
 # === Change Classification ===
-def classify_change(old_text: str, new_text: str) -> tuple[str, str, str]:
+# MEANINGFUL patterns (aligned with FSI-AgentGov priorities):
+# (group name, pattern, reason). Compiled into one alternation below.
+MEANINGFUL_PATTERNS = [
+    # UI Navigation (CRITICAL for playbooks)
+    ('ui_navigation', r'\d+\.\s+(?:click|select|go to|navigate)', 'UI navigation steps'),
+    ('portal_references', r'(?:Admin center|portal|Power Platform|Purview)', 'Portal references'),
+    ('ui_elements', r'(?:button|menu|tab|panel|dialog|blade)', 'UI element names'),
+
+    # Policy/Compliance (HIGH for controls)
+    ('policy_callouts', r'(?:Important|Warning|Note|Caution):', 'Policy callout blocks'),
+    ('policy_language', r'(?:required|must|should not|prohibited)', 'Policy language'),
+    ('compliance_features', r'(?:compliance|audit|retention|DLP)', 'Compliance features'),
+
+    # Deprecation (HIGH - requires action)
+    ('deprecation', r'(?:deprecated|removed|no longer|retired)', 'Deprecation notice'),
+    ('feature_availability', r'(?:preview|GA|generally available)', 'Feature availability'),
+    ('breaking_changes', r'(?:breaking change|migration)', 'Breaking changes'),
+
+    # Configuration (MEDIUM-HIGH)
+    ('configuration', r'(?:enable|disable|configure|set to)', 'Configuration instructions'),
+    ('automation', r'(?:PowerShell|cmdlet|Graph API)', 'Automation references'),
+    ('licensing', r'(?:license|SKU|E5|E3)', 'Licensing requirements'),
+]
+MEANINGFUL_RE = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern, _ in MEANINGFUL_PATTERNS),
+                           re.IGNORECASE)
+MEANINGFUL_REASONS = {name: reason for name, _, reason in MEANINGFUL_PATTERNS}
+# Categories that require action in any affected doc (see determine_priority)
+ESCALATING_CATEGORIES = ('Deprecation notice', 'Breaking changes')
+
+# NOISE patterns
+NOISE_RE = re.compile(r'^[-+]\s*$|ms\.(?:date|author|reviewer|topic)|(?:Article|Contributor|Feedback)',
+                      re.IGNORECASE)
+
+
+def classify_change(old_text: str, new_text: str) -> tuple[str, str, str, dict]:
     """
     Classify change and generate diff.
-    Returns (classification, reason, diff_text)
+    Returns (classification, reason, diff_text, categories)
     """
     # Generate unified diff
     old_lines = old_text.splitlines(keepends=True)
     new_lines = new_text.splitlines(keepends=True)
-    diff_lines = list(difflib.unified_diff(old_lines, new_lines, lineterm=''))
-
-    if not diff_lines:
-        return ('noise', 'No text changes detected', '')
-
-    diff_text = ''.join(diff_lines[:100])  # Limit diff size
-
-    # MEANINGFUL patterns (aligned with FSI-AgentGov priorities)
-    meaningful_patterns = [
-        # UI Navigation (CRITICAL for playbooks)
-        (r'\d+\.\s+(click|select|go to|navigate)', 'UI navigation steps'),
-        (r'(Admin center|portal|Power Platform|Purview)', 'Portal references'),
-        (r'(button|menu|tab|panel|dialog|blade)', 'UI element names'),
-
-        # Policy/Compliance (HIGH for controls)
-        (r'(Important|Warning|Note|Caution):', 'Policy callout blocks'),
-        (r'(required|must|should not|prohibited)', 'Policy language'),
-        (r'(compliance|audit|retention|DLP)', 'Compliance features'),
-
-        # Deprecation (HIGH - requires action)
-        (r'(deprecated|removed|no longer|retired)', 'Deprecation notice'),
-        (r'(preview|GA|generally available)', 'Feature availability'),
-        (r'(breaking change|migration)', 'Breaking changes'),
-
-        # Configuration (MEDIUM-HIGH)
-        (r'(enable|disable|configure|set to)', 'Configuration instructions'),
-        (r'(PowerShell|cmdlet|Graph API)', 'Automation references'),
-        (r'(license|SKU|E5|E3)', 'Licensing requirements'),
-    ]
+    return _classify_diff(unified_diff(old_lines, new_lines))
 
-    # Check diff lines for meaningful patterns
-    for line in diff_lines:
-        if line.startswith('+') or line.startswith('-'):
-            for pattern, reason in meaningful_patterns:
-                if re.search(pattern, line, re.IGNORECASE):
-                    return ('meaningful', reason, diff_text)
-
-    # NOISE patterns
-    noise_patterns = [
-        r'^[-+]\s*$',
-        r'ms\.(date|author|reviewer|topic)',
-        r'(Article|Contributor|Feedback)',
-    ]
 
+def _classify_diff(diff_lines) -> tuple[str, str, str, dict]:
+    """
+    Classify a unified diff, given as an iterable of lines, in one pass.
+
+    Each changed line is scanned once against the combined MEANINGFUL_RE;
+    ``categories`` maps every matched reason to its hit count, strongest
+    first (escalating categories, then most hits). The first one is the
+    reported reason.
+    """
+    head: list[str] = []  # Limit diff size
+    hits: dict[str, int] = defaultdict(int)
     noise_only = True
     for line in diff_lines:
-        if line.startswith('+') or line.startswith('-'):
-            is_noise = any(re.search(p, line, re.IGNORECASE) for p in noise_patterns)
-            if not is_noise and line.strip() not in ['+', '-', '+++', '---']:
-                noise_only = False
-                break
+        if len(head) < DIFF_MAX_LINES:
+            head.append(line)
+        if not (line.startswith('+') or line.startswith('-')):
+            continue
+
+        for match in MEANINGFUL_RE.finditer(line):
+            hits[MEANINGFUL_REASONS[match.lastgroup]] += 1
+
+        if noise_only and not NOISE_RE.search(line) and line.strip() not in ['+', '-', '+++', '---']:
+            noise_only = False
+
+    if not head:
+        return ('noise', 'No text changes detected', '', {})
+
+    diff_text = ''.join(head)
+    if hits:
+        order = list(MEANINGFUL_REASONS.values())
+        categories = dict(sorted(hits.items(), key=lambda item: (
+            item[0] not in ESCALATING_CATEGORIES, -item[1], order.index(item[0]))))
+        return ('meaningful', next(iter(categories)), diff_text, categories)
 
     if noise_only:
-        return ('noise', 'Metadata or formatting only', diff_text)
+        return ('noise', 'Metadata or formatting only', diff_text, {})
+
+    return ('minor', 'General content update', diff_text, {})
+
+
+_HUNK_HEADER_RE = re.compile(r'^@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@')
+
+
+def _offset_hunks(diff_lines, old_offset: int, new_offset: int):
+    """Shift unified-diff hunk line numbers by the block's position in the page."""
+    for line in diff_lines:
+        match = _HUNK_HEADER_RE.match(line)
+        if match:
+            line = (f"@@ -{int(match.group(1)) + old_offset}{match.group(2) or ''} "
+                    f"+{int(match.group(3)) + new_offset}{match.group(4) or ''} @@"
+                    + line[match.end():])
+        yield line
+
+
+def _block_spans(blocks: list) -> list[tuple]:
+    """(heading, hash, start_line, end_line) per block."""
+    out, start = [], 0
+    for heading, count, digest in blocks:
+        out.append((heading, digest, start, start + count))
+        start += count
+    return out
+
+
+def _changed_range(old: list[tuple], new: list[tuple]) -> tuple[int, int, int]:
+    """Skip common leading and trailing blocks: returns (lo, hi_old, hi_new)."""
+    lo = 0
+    while lo < min(len(old), len(new)) and old[lo][1] == new[lo][1]:
+        lo += 1
+    hi_old, hi_new = len(old), len(new)
+    while hi_old > lo and hi_new > lo and old[hi_old - 1][1] == new[hi_new - 1][1]:
+        hi_old -= 1
+        hi_new -= 1
+    return lo, hi_old, hi_new
+
+
+def changed_blocks(old_blocks: list, new_blocks: list) -> list[tuple]:
+    """
+    Find the sections that differ between two block vectors, in linear time.
+
+    Common leading and trailing blocks are skipped; in between, a block whose
+    hash occurs on the other side is unchanged (or merely moved). Changed
+    blocks are paired by heading. Returns ``(heading, old_span, new_span)``
+    tuples where a span is ``(start_line, end_line)`` or None for a section
+    that was added or removed (or renamed).
+    """
+    old, new = _block_spans(old_blocks), _block_spans(new_blocks)
+    lo, hi_old, hi_new = _changed_range(old, new)
+    old_mid, new_mid = old[lo:hi_old], new[lo:hi_new]
+    old_hashes = {b[1] for b in old_mid}
+    new_hashes = {b[1] for b in new_mid}
+    removed: dict[str, list] = defaultdict(list)
+    for heading, digest, start, end in old_mid:
+        if digest not in new_hashes:
+            removed[heading].append((start, end))
+
+    changes = []
+    for heading, digest, start, end in new_mid:
+        if digest in old_hashes:
+            continue
+        old_span = removed[heading].pop(0) if removed.get(heading) else None
+        changes.append((heading, old_span, (start, end)))
+    for heading, old_spans in removed.items():
+        changes.extend((heading, old_span, None) for old_span in old_spans)
+    return changes
+
+
+def _changed_span(old_blocks: list, new_blocks: list, old_line_count: int) -> tuple[int, int, int]:
+    """Lines from the first to the last changed section: (start, old_end, new_end)."""
+    old, new = _block_spans(old_blocks), _block_spans(new_blocks)
+    lo, hi_old, hi_new = _changed_range(old, new)
+    start = old[lo][2] if lo < len(old) else old_line_count
+    old_end = old[hi_old - 1][3] if hi_old > lo else start
+    new_end = new[hi_new - 1][3] if hi_new > lo else start
+    return start, old_end, new_end
 
-    return ('minor', 'General content update', diff_text)
+
+def _section_names(old_blocks: list, new_blocks: list) -> list[str]:
+    sections: list[str] = []
+    for heading, _, _ in changed_blocks(old_blocks, new_blocks):
+        if heading not in sections:
+            sections.append(heading)
+    return sections
+
+
+def _blocks_match(old_blocks: Optional[list], old_lines: list) -> bool:
+    """True if the stored block vector describes ``old_lines`` (not older state)."""
+    return bool(old_blocks) and sum(b[1] for b in old_blocks) == len(old_lines)
+
+
+def classify_blocks(old_text: str, old_blocks: Optional[list], new_text: str,
+                    new_blocks: list) -> Optional[tuple[str, str, str, dict, list]]:
+    """
+    Diff and classify only the lines between the first and last changed
+    section: common leading and trailing sections are skipped, the span in
+    between is diffed as one piece so hunk line numbers stay in page order
+    (pairing sections by heading breaks when a heading is renamed).
+    Returns (classification, reason, diff_text, categories, changed_sections),
+    or None when ``old_blocks`` does not describe ``old_text`` (e.g. older state).
+    """
+    old_lines = old_text.splitlines(keepends=True)
+    if not _blocks_match(old_blocks, old_lines):
+        return None
+    new_lines = new_text.splitlines(keepends=True)
+
+    start, old_end, new_end = _changed_span(old_blocks, new_blocks, len(old_lines))
+    span_diff = unified_diff(old_lines[start:old_end], new_lines[start:new_end])
+    return (*_classify_diff(_offset_hunks(span_diff, start, start)),
+            _section_names(old_blocks, new_blocks))
+
+
+def meaningful_edit(old_lines: list, new_lines: list) -> bool:
+    """
+    True if a line found on only one side matches MEANINGFUL_RE. Much cheaper
+    than a diff: the lines are compared as multisets, so a line that merely
+    moved does not count as added or removed.
+    """
+    old_counts, new_counts = Counter(old_lines), Counter(new_lines)
+    return any(MEANINGFUL_RE.search(line)
+               for line in itertools.chain(old_counts - new_counts, new_counts - old_counts))
+
+
+def near_duplicate(previous: dict, analysis: PageAnalysis, max_distance: int) -> Optional[int]:
+    """
+    Return the SimHash distance if this change is close enough to the
+    previous text to be a near-duplicate, else None. That needs the previous
+    fingerprint under the same boilerplate model and a distance of at most
+    ``max_distance``. The caller still checks the added and removed lines
+    (see meaningful_edit) before skipping the diff.
+    """
+    old_simhash = previous.get("simhash")
+    if max_distance <= 0 or not old_simhash or not analysis.simhash \
+            or previous.get("boilerplate") != analysis.boilerplate:
+        return None
+    distance = simhash_distance(old_simhash, analysis.simhash)
+    return distance if distance <= max_distance else None
+
+
+def analyze_page(html: str, previous: Optional[dict] = None, snapshot_root: Optional[str] = None,
+                 boilerplate: Optional[BoilerplateModel] = None,
+                 extractor: str = "auto", simhash_max_distance: int = SIMHASH_DISTANCE) -> PageAnalysis:
+    """
+    CPU-bound pipeline stage: extract, strip boilerplate, hash and, if the
+    hash moved, classify. Runs in a worker process, so it takes only
+    picklable arguments: ``previous`` holds the URL's stored content fields
+    (content_hash, snapshot_hash, blocks, boilerplate, legacy
+    normalized_content), and the previous snapshot is loaded here.
+
+    With the previous section hashes only the changed sections are diffed,
+    and without them the whole page is. A change within
+    ``simhash_max_distance`` bits of the previous SimHash that adds or removes
+    no line matching MEANINGFUL_RE is labeled noise without a diff (see
+    near_duplicate). ``classification`` stays None when the
+    page did not change, including when only the boilerplate model did.
+    Time spent per stage is returned in ``timings``.
+    """
+    previous = previous or {}
+    timings: dict[str, float] = {}
+    with timed(timings, "extract"):
+        raw, headings = extract_page(html, extractor)
+        normalized = boilerplate.strip(raw) if boilerplate else raw
+    with timed(timings, "hash"):
+        analysis = PageAnalysis(normalized=normalized, content_hash=compute_hash(normalized),
+                                blocks=compute_blocks(normalized, headings),
+                                boilerplate=boilerplate.fingerprint if boilerplate else None,
+                                timings=timings)
+        if normalized != raw:
+            analysis.snapshot_text, analysis.snapshot_hash = raw, compute_hash(raw)
+
+        old_hash = previous.get("content_hash")
+        if analysis.content_hash != old_hash or not previous.get("simhash"):
+            analysis.simhash = compute_simhash(normalized)
+    if old_hash is None or analysis.content_hash == old_hash:
+        return analysis
+    with timed(timings, "classify"):
+        _classify_page(analysis, previous, snapshot_root, boilerplate, simhash_max_distance)
+    return analysis
+
+
+def _classify_page(analysis: PageAnalysis, previous: dict, snapshot_root: Optional[str],
+                   boilerplate: Optional[BoilerplateModel], simhash_max_distance: int):
+    """Fill in ``analysis``'s classification for a page whose hash moved."""
+    normalized = analysis.normalized
+    old_hash = previous["content_hash"]
+    old_content = previous.get("normalized_content")
+    if old_content is None and snapshot_root:
+        old_content = SnapshotStore(Path(snapshot_root), read_only=True).get(
+            previous.get("snapshot_hash") or old_hash)
+    old_blocks = previous.get("blocks")
+    if old_content and boilerplate:
+        # Snapshots keep the unstripped text
+        old_content = boilerplate.strip(old_content)
+    if old_content and previous.get("boilerplate") != analysis.boilerplate:
+        # Hashed under another model: the stored hash and blocks don't apply
+        old_blocks = None
+        if compute_hash(old_content) == analysis.content_hash:
+            return
+
+    analysis.missing_previous = not old_content
+    distance = near_duplicate(previous, analysis, simhash_max_distance) if old_content else None
+    if distance is not None:
+        # Barely moved: diff only if an added or removed line looks meaningful
+        old_lines = old_content.splitlines(keepends=True)
+        new_lines = normalized.splitlines(keepends=True)
+        if _blocks_match(old_blocks, old_lines):
+            start, old_end, new_end = _changed_span(old_blocks, analysis.blocks, len(old_lines))
+            old_lines, new_lines = old_lines[start:old_end], new_lines[start:new_end]
+            analysis.changed_sections = _section_names(old_blocks, analysis.blocks)
+        if not meaningful_edit(old_lines, new_lines):
+            analysis.classification = 'noise'
+            analysis.reason = f'Near-duplicate (SimHash distance {distance})'
+            analysis.near_duplicate = distance
+            return
+
+    by_block = classify_blocks(old_content, old_blocks, normalized, analysis.blocks) \
+        if old_content else None
+    if by_block:
+        (analysis.classification, analysis.reason, analysis.diff_text,
+         analysis.categories, analysis.changed_sections) = by_block
+    else:
+        (analysis.classification, analysis.reason, analysis.diff_text,
+         analysis.categories) = classify_change(old_content or "", normalized)
+
+
+def _content_fields(analysis: PageAnalysis) -> dict:
+    """State fields describing a URL's extracted content."""
+    fields = {
+        "content_hash": analysis.content_hash,
+        "blocks": analysis.blocks,
+        "snapshot_hash": analysis.snapshot_hash,
+        "boilerplate": analysis.boilerplate,
+        "simhash": analysis.simhash,
+    }
+    return {k: v for k, v in fields.items() if v}
 
 
 # === Impact Mapping ===
-def find_affected_files(url: str, docs_dir: Path) -> dict:
+_LOCALE_SEGMENT_RE = re.compile(r"^/[a-z]{2}(?:-[a-z]{2,4})?(?=/|$)", re.IGNORECASE)
+
+
+def normalize_learn_url(url: str) -> str:
+    """
+    Reduce a Learn URL to a lookup key: lowercase host and path, no locale
+    segment (``/en-us/``), query (``?tabs=``, ``?view=``), fragment, or
+    trailing slash.
+    """
+    parsed = urlparse(url.strip().rstrip(".,;:"))
+    path = _LOCALE_SEGMENT_RE.sub("", parsed.path).rstrip("/").lower()
+    return f"{parsed.netloc.lower()}{path}"
+
+
+class DocsLinkIndex:
+    """
+    Reverse index from normalized Learn URL to the controls and playbooks
+    that link to it. Built in one pass over the docs tree, so each changed
+    URL is a dictionary lookup rather than a rescan. Per-file links and
+    titles come from the shared DocsLinkCache, so only docs files changed
+    since the last run are re-parsed.
+    """
+
+    def __init__(self, docs_dir: Path):
+        self.docs_dir = docs_dir
+        self.controls: dict[str, list[dict]] = defaultdict(list)
+        self.playbooks: dict[str, list[dict]] = defaultdict(list)
+
+    @classmethod
+    def build(cls, docs_dir: Path, cache: Optional[DocsLinkCache] = None) -> "DocsLinkIndex":
+        index = cls(docs_dir)
+        owns_cache = cache is None
+        if owns_cache:
+            cache = DocsLinkCache(docs_dir)
+
+        controls_dir = docs_dir / 'controls'
+        for control_file in sorted(controls_dir.glob('pillar-*/*.md')):
+            facts = cache.facts(control_file)
+            if facts is None:
+                continue
+            record = {
+                'control_id': control_file.stem.split('-')[0],
+                'title': facts.title or control_file.stem,
+                'file_path': str(control_file.relative_to(docs_dir)),
+            }
+            for key in index._link_keys(facts.learn_links):
+                index.controls[key].append(record)
+
+        # control-implementations/<id>/*.md plus every other playbook folder
+        # (agent-lifecycle, incident-and-risk, ...), keyed by folder name
+        playbooks_dir = docs_dir / 'playbooks'
+        for playbook_file in sorted(playbooks_dir.glob('*/**/*.md')):
+            facts = cache.facts(playbook_file)
+            if facts is None:
+                continue
+            parent = playbook_file.parent
+            playbook_type = playbook_file.stem
+            record = {
+                'control_id': parent.name if parent.parent.name == 'control-implementations'
+                              else str(parent.relative_to(playbooks_dir).as_posix()),
+                'playbook_type': playbook_type,
+                'file_path': str(playbook_file.relative_to(docs_dir)),
+                'priority': 'CRITICAL' if playbook_type == 'portal-walkthrough' else 'HIGH',
+            }
+            for key in index._link_keys(facts.learn_links):
+                index.playbooks[key].append(record)
+
+        if owns_cache:
+            try:
+                cache.save()
+            except OSError as e:
+                logger.warning(f"Could not save docs link cache: {e}")
+        logger.debug(f"Docs link index: {cache.parsed} files parsed, {cache.reused} from cache")
+        return index
+
+    @staticmethod
+    def _link_keys(links: list[str]) -> set:
+        return {normalize_learn_url(link) for link in links}
+
+    def lookup(self, url: str) -> dict:
+        key = normalize_learn_url(url)
+        return {
+            'controls': list(self.controls.get(key, [])),
+            'playbooks': list(self.playbooks.get(key, [])),
+        }
+
+
+def find_affected_files(url: str, docs_dir: Path, index: Optional[DocsLinkIndex] = None) -> dict:
     """
     Find controls and playbooks that reference this URL.
+    Pass a prebuilt ``index`` when looking up more than one URL.
     """
-    affected = {'controls': [], 'playbooks': []}
-
-    # Scan controls
-    controls_dir = docs_dir / 'controls'
-    if controls_dir.exists():
-        for pillar_dir in controls_dir.glob('pillar-*'):
-            for control_file in pillar_dir.glob('*.md'):
-                try:
-                    content = control_file.read_text(encoding='utf-8')
-                    if url in content:
-                        control_id = control_file.stem.split('-')[0]
-                        title_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
-                        affected['controls'].append({
-                            'control_id': control_id,
-                            'title': title_match.group(1) if title_match else control_file.stem,
-                            'file_path': str(control_file.relative_to(docs_dir)),
-                        })
-                except Exception:
-                    continue
-
-    # Scan playbooks
-    playbooks_dir = docs_dir / 'playbooks' / 'control-implementations'
-    if playbooks_dir.exists():
-        for control_dir in playbooks_dir.glob('*'):
-            for playbook_file in control_dir.glob('*.md'):
-                try:
-                    content = playbook_file.read_text(encoding='utf-8')
-                    if url in content:
-                        playbook_type = playbook_file.stem
-                        priority = 'CRITICAL' if playbook_type == 'portal-walkthrough' else 'HIGH'
-                        affected['playbooks'].append({
-                            'control_id': control_dir.name,
-                            'playbook_type': playbook_type,
-                            'file_path': str(playbook_file.relative_to(docs_dir)),
-                            'priority': priority,
-                        })
-                except Exception:
-                    continue
-
-    return affected
+    if index is None:
+        index = DocsLinkIndex.build(docs_dir)
+    return index.lookup(url)
 
 
 def determine_priority(change: ChangeRecord) -> str:
-    """Determine overall priority based on affected files."""
+    """Determine overall priority based on affected files and matched categories."""
+    if change.near_duplicate is not None:
+        return 'LOW'  # noise; kept out of the report (see --diff)
     if any(p.get('priority') == 'CRITICAL' for p in change.affected_playbooks):
         return 'CRITICAL'
+    # A deprecation or breaking change needs action wherever the page is cited
+    if (change.affected_playbooks or change.affected_controls) and \
+            any(c in change.categories for c in ESCALATING_CATEGORIES):
+        return 'CRITICAL'
     if change.affected_playbooks or change.classification == 'meaningful':
         return 'HIGH'
     if change.affected_controls:
@@ -371,6 +2035,391 @@ def determine_priority(change: ChangeRecord) -> str:
     return 'LOW'
 
 
+# === Scheduling ===
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def change_rate(url_state: dict, now: datetime) -> float:
+    """
+    Estimated changes per day for a URL: the changes seen since it was first
+    checked, plus a prior of one change per SCHEDULE_PRIOR_DAYS, so a URL
+    with little history is checked often until it has some.
+    """
+    start = _parse_time(url_state.get("first_checked") or url_state.get("last_changed")) or now
+    observed_days = max(0.0, (now - start).total_seconds() / 86400)
+    return (url_state.get("change_count", 0) + 1) / (observed_days + SCHEDULE_PRIOR_DAYS)
+
+
+def revisit_interval(url_state: dict, now: datetime, critical: bool = False) -> float:
+    """Days to wait between checks of a URL, from its estimated change rate."""
+    interval = 1 / (change_rate(url_state, now) * SCHEDULE_CHECKS_PER_CHANGE)
+    upper = SCHEDULE_CRITICAL_MAX_INTERVAL if critical else SCHEDULE_MAX_INTERVAL
+    return min(max(interval, SCHEDULE_MIN_INTERVAL), upper)
+
+
+def critical_urls(index: DocsLinkIndex, entries: list[URLEntry]) -> set:
+    """Watchlist URLs cited by a CRITICAL (portal walkthrough) playbook."""
+    return {e.url for e in entries
+            if any(p['priority'] == 'CRITICAL' for p in index.lookup(e.url)['playbooks'])}
+
+
+def plan_checks(entries: list[URLEntry], url_states: dict, now: datetime, critical: set,
+                due_only: bool = True,
+                max_requests: Optional[int] = None) -> tuple[list[URLEntry], int]:
+    """
+    Pick the URLs to check this run, most overdue first. A URL is due once
+    the time since its last check reaches its revisit interval; URLs never
+    checked, or whose last check failed, are always due. With ``due_only``
+    off, URLs that are not yet due follow the due ones. At most
+    ``max_requests`` URLs are returned.
+
+    Returns (selected entries, number of URLs due).
+    """
+    ranked = []
+    for position, entry in enumerate(entries):
+        url_state = url_states.get(entry.url, {})
+        last_checked = _parse_time(url_state.get("last_checked"))
+        if last_checked is None or url_state.get("last_status", 200) != 200:
+            overdue = float('inf')
+        else:
+            elapsed = (now - last_checked).total_seconds() / 86400
+            overdue = elapsed / revisit_interval(url_state, now, entry.url in critical)
+        ranked.append((-overdue, position, entry))
+    ranked.sort(key=lambda item: item[:2])
+
+    due = sum(1 for overdue, _, _ in ranked if -overdue >= 1)
+    selected = [entry for _, _, entry in ranked]
+    if due_only:
+        selected = selected[:due]
+    if max_requests is not None:
+        selected = selected[:max_requests]
+    return selected, due
+
+
+# === Metrics ===
+@contextmanager
+def timed(timings: dict, stage: str):
+    """Add the time spent in the block to ``timings[stage]`` (seconds)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+class RunMetrics:
+    """
+    Per-run stage timings and page sizes, kept as Prometheus-style
+    histograms (cumulative count per bucket upper bound, plus count and
+    sum) so they can be stored in state["metrics"], summed across shards
+    and written as a node_exporter textfile unchanged. Fetch threads and
+    analysis processes return their timings in FetchResult and
+    PageAnalysis; only the main loop observes, so nothing is locked.
+    """
+
+    def __init__(self, data: Optional[dict] = None):
+        data = data or {}
+        self.run_seconds: float = data.get("run_seconds", 0.0)
+        self.stage_seconds: dict[str, dict] = data.get("stage_seconds", {})
+        self.page_bytes: dict[str, dict] = data.get("page_bytes", {})
+        self.slowest_pages: list[dict] = data.get("slowest_pages", [])
+
+    @staticmethod
+    def _observe(histograms: dict, name: str, bounds: tuple, value: float):
+        histogram = histograms.setdefault(
+            name, {"count": 0, "sum": 0, "buckets": {str(bound): 0 for bound in bounds}})
+        histogram["count"] += 1
+        histogram["sum"] += value
+        for bound in bounds:
+            if value <= bound:
+                histogram["buckets"][str(bound)] += 1
+
+    def observe(self, stage: str, seconds: float):
+        self._observe(self.stage_seconds, stage, METRIC_DURATION_BUCKETS, seconds)
+
+    def observe_bytes(self, kind: str, size: int):
+        self._observe(self.page_bytes, kind, METRIC_SIZE_BUCKETS, size)
+
+    def observe_page(self, url: str, seconds: float):
+        """Keep ``url`` if its fetch is among the METRIC_SLOWEST_PAGES slowest."""
+        self.slowest_pages.append({"url": url, "seconds": round(seconds, 3)})
+        self.slowest_pages.sort(key=lambda page: page["seconds"], reverse=True)
+        del self.slowest_pages[METRIC_SLOWEST_PAGES:]
+
+    @contextmanager
+    def timer(self, stage: str):
+        timings: dict[str, float] = {}
+        with timed(timings, stage):
+            yield
+        self.observe(stage, timings[stage])
+
+    def merge(self, other: "RunMetrics"):
+        """Add another shard's observations. Shards run side by side, so run time is the longest."""
+        for histograms, theirs in ((self.stage_seconds, other.stage_seconds),
+                                   (self.page_bytes, other.page_bytes)):
+            for name, histogram in theirs.items():
+                mine = histograms.setdefault(
+                    name, {"count": 0, "sum": 0, "buckets": dict.fromkeys(histogram["buckets"], 0)})
+                mine["count"] += histogram["count"]
+                mine["sum"] += histogram["sum"]
+                for bound, count in histogram["buckets"].items():
+                    mine["buckets"][bound] = mine["buckets"].get(bound, 0) + count
+        for page in other.slowest_pages:
+            self.observe_page(page["url"], page["seconds"])
+        self.run_seconds = max(self.run_seconds, other.run_seconds)
+
+    def as_dict(self) -> dict:
+        for histogram in (*self.stage_seconds.values(), *self.page_bytes.values()):
+            histogram["sum"] = round(histogram["sum"], 6)
+        return {
+            "run_seconds": round(self.run_seconds, 3),
+            "stage_seconds": self.stage_seconds,
+            "page_bytes": self.page_bytes,
+            "slowest_pages": self.slowest_pages,
+        }
+
+
+def _prometheus_histogram(name: str, label: str, histograms: dict, help_text: str) -> list[str]:
+    if not histograms:
+        return []
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in sorted(histograms.items()):
+        for bound, count in histogram["buckets"].items():
+            lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {histogram["count"]}')
+        lines.append(f'{name}_sum{{{label}="{key}"}} {histogram["sum"]}')
+        lines.append(f'{name}_count{{{label}="{key}"}} {histogram["count"]}')
+    return lines
+
+
+def metrics_textfile(state: dict) -> str:
+    """
+    Render the last run's state["metrics"] and state["statistics"] in the
+    Prometheus text format read by node_exporter's textfile collector.
+    """
+    metrics = RunMetrics(state.get("metrics"))
+    lines = _prometheus_histogram("learn_monitor_stage_duration_seconds", "stage",
+                                  metrics.stage_seconds, "Time per page spent in each monitor stage.")
+    lines += _prometheus_histogram("learn_monitor_page_size_bytes", "kind", metrics.page_bytes,
+                                   "Response body size per fetched page.")
+    gauges = {"learn_monitor_run_duration_seconds": metrics.run_seconds}
+    if state.get("last_run"):
+        gauges["learn_monitor_last_run_timestamp_seconds"] = \
+            datetime.fromisoformat(state["last_run"]).timestamp()
+    for key, value in state.get("statistics", {}).items():
+        if isinstance(value, (int, float)):
+            gauges[f"learn_monitor_{key}"] = value
+    for name, value in gauges.items():
+        lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_textfile(path: Path, state: dict):
+    """Write metrics_textfile atomically, so the collector never reads half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(metrics_textfile(state), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+# === Sharding ===
+def shard_of(url: str, count: int) -> int:
+    """
+    The 1-based shard a URL belongs to out of ``count``. Keyed by the SHA-256
+    of the normalized URL, so every machine and run splits the watchlist the
+    same way and locale variants of a page share a shard.
+    """
+    digest = hashlib.sha256(normalize_learn_url(url).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def shard_path(shard_dir: Path, index: int, count: int) -> Path:
+    return shard_dir / f"shard-{index}-of-{count}.json"
+
+
+def load_shards(shard_dir: Path) -> list[tuple[Path, dict]]:
+    """
+    Read every shard output under ``shard_dir``, including subfolders (one
+    per downloaded CI artifact). Each shard's new snapshots sit beside it in
+    ``snapshots/``.
+    """
+    return [(path, json.loads(path.read_text(encoding="utf-8")))
+            for path in sorted(shard_dir.rglob("shard-*-of-*.json"))]
+
+
+@dataclass
+class ShardMerge:
+    changes: list = field(default_factory=list)
+    redirects: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    deferred: list = field(default_factory=list)
+    conflicts: list = field(default_factory=list)
+    missing: list = field(default_factory=list)   # shard indexes with no output
+    paths: list = field(default_factory=list)     # shard outputs merged
+    run_time: Optional[str] = None
+    statistics: dict = field(default_factory=dict)
+    metrics: RunMetrics = field(default_factory=RunMetrics)
+
+
+def merge_shards(state: dict, shards: list[tuple[Path, dict]],
+                 entries: list[URLEntry]) -> ShardMerge:
+    """
+    Fold shard outputs into ``state``. Nothing is changed when there are
+    conflicts: shards split with different counts, two different outputs
+    for one shard, a shard run against an older or newer state file than
+    ``state``, or a URL outside its shard. Watchlist URLs of a shard with no
+    output keep their previous state and are reported as deferred.
+    """
+    merge = ShardMerge()
+    outputs: dict[int, tuple[Path, dict]] = {}
+    counts = sorted({shard["shard"]["count"] for _, shard in shards})
+    if len(counts) > 1:
+        merge.conflicts.append(f"Shard outputs were split {' and '.join(map(str, counts))} ways")
+    for path, shard in shards:
+        index, count = shard["shard"]["index"], shard["shard"]["count"]
+        if index in outputs:
+            if outputs[index][1] != shard:
+                merge.conflicts.append(f"{path}: shard {index}/{count} also written to "
+                                       f"{outputs[index][0]}")
+            continue
+        outputs[index] = (path, shard)
+        if shard["base_run"] != state["last_run"]:
+            merge.conflicts.append(f"{path}: ran against state from {shard['base_run']}, "
+                                   f"but the state file is from {state['last_run']}")
+        for url in shard["urls"]:
+            if shard_of(url, count) != index:
+                merge.conflicts.append(f"{path}: {url} belongs to shard "
+                                       f"{shard_of(url, count)}/{count}")
+    if merge.conflicts or not outputs:
+        return merge
+
+    count = counts[0]
+    merge.statistics["total_urls"] = len(entries)
+    merge.missing = [i for i in range(1, count + 1) if i not in outputs]
+    run_starts = []
+    for index in sorted(outputs):
+        path, shard = outputs[index]
+        merge.paths.append(path)
+        state["urls"].update(shard["urls"])
+        merge.changes.extend(ChangeRecord(**c) for c in shard["changes"])
+        merge.redirects.extend(shard["redirects"])
+        merge.errors.extend(shard["errors"])
+        merge.deferred.extend(shard["deferred"])
+        for key, value in shard["statistics"].items():
+            merge.statistics[key] = merge.statistics.get(key, 0) + value
+        merge.metrics.merge(RunMetrics(shard.get("metrics")))
+        merge.run_time = max(merge.run_time or "", shard["run_time"])
+        run_starts.append(shard["run_started"])
+    for entry in entries:
+        if shard_of(entry.url, count) in merge.missing:
+            merge.deferred.append({'url': entry.url, 'topic': entry.topic,
+                                   'reason': f"shard {shard_of(entry.url, count)}/{count} "
+                                             f"output missing"})
+
+    # Report in watchlist order, not shard order
+    position = {e.url: i for i, e in enumerate(entries)}
+    merge.changes.sort(key=lambda c: position.get(c.url, len(position)))
+    for items, key in ((merge.redirects, 'original'), (merge.errors, 'url'),
+                       (merge.deferred, 'url')):
+        items.sort(key=lambda item: position.get(item[key], len(position)))
+
+    merge.statistics["last_run_deferred"] = len(merge.deferred)
+    state["last_run"] = merge.run_time
+    state["statistics"] = merge.statistics
+    state["metrics"] = merge.metrics.as_dict()
+    if merge.deferred:
+        state["checkpoint"] = {"started": min(run_starts)}
+    else:
+        state.pop("checkpoint", None)
+    return merge
+
+
+# === Redirects ===
+def remembered_redirect(url_state: dict, now: datetime) -> Optional[str]:
+    """
+    Where a watchlist URL redirected to, if that was confirmed within
+    REDIRECT_REVALIDATE_DAYS. Fetching it directly saves a round trip; once
+    the confirmation is older, the watchlist URL is requested again.
+    """
+    confirmed = _parse_time(url_state.get("redirect_checked"))
+    if not url_state.get("final_url") or confirmed is None:
+        return None
+    if (now - confirmed).total_seconds() >= REDIRECT_REVALIDATE_DAYS * 86400:
+        return None
+    return url_state["final_url"]
+
+
+def remember_redirect(url_state: dict, result: FetchResult, now: str):
+    """Record a fetch's redirect target in state, or forget one that is gone."""
+    if result.remembered:
+        url_state["final_url"] = result.final_url
+    elif result.was_redirected:
+        url_state["final_url"] = result.final_url
+        url_state["redirect_checked"] = now
+    else:
+        url_state.pop("final_url", None)
+        url_state.pop("redirect_checked", None)
+
+
+def redirect_map(state: dict, entries: list[URLEntry]) -> dict[str, str]:
+    """
+    Watchlist spelling -> remembered final URL, for every entry that
+    redirects to a different page (not just to another spelling of itself).
+    """
+    redirects = {}
+    for entry in entries:
+        final_url = state["urls"].get(entry.url, {}).get("final_url")
+        if final_url and canonical_learn_url(final_url) != entry.url:
+            for spelling in (entry.url, *entry.aliases):
+                redirects[spelling.split("#", 1)[0]] = final_url
+    return redirects
+
+
+def rewrite_learn_urls(text: str, redirects: dict[str, str]) -> tuple[str, int]:
+    """
+    Replace every link to a redirected URL in ``text`` with its final URL,
+    in one regex pass for all of them. Matching ignores case; a fragment
+    (``#section``) is kept and links with their own query are left alone.
+    Returns (new text, replacements made).
+    """
+    if not redirects:
+        return text, 0
+    targets = {url.lower(): final for url, final in redirects.items()}
+    alternation = "|".join(re.escape(url) for url in sorted(targets, key=len, reverse=True))
+    pattern = re.compile(rf"(?:{alternation})(?=[.,;:]*(?:[\s)\]>\"'|`#]|$))", re.IGNORECASE)
+    return pattern.subn(lambda m: targets[m.group(0).lower()], text)
+
+
+def plan_redirect_rewrites(redirects: dict[str, str],
+                           docs_dir: Path) -> list[tuple[Path, str, str, int]]:
+    """
+    (path, old text, new text, replacements) for every docs markdown file
+    that links to a redirected URL. The watchlist is one of them. Files are
+    picked from the shared DocsLinkCache, so only those with a matching
+    Learn link are read in full.
+    """
+    keys = {normalize_learn_url(url) for url in redirects}
+    cache = DocsLinkCache(docs_dir)
+    rewrites = []
+    for path in sorted(docs_dir.rglob("*.md")):
+        facts = cache.facts(path)
+        if facts is None or keys.isdisjoint(normalize_learn_url(u) for u in facts.learn_links):
+            continue
+        text = path.read_bytes().decode("utf-8")  # keeps line endings as they are
+        new_text, count = rewrite_learn_urls(text, redirects)
+        if count:
+            rewrites.append((path, text, new_text, count))
+    try:
+        cache.save()
+    except OSError as e:
+        logger.warning(f"Could not save docs link cache: {e}")
+    return rewrites
+
+
 # === State Management ===
 def load_state(state_path: Path) -> dict:
     """Load state from JSON file."""
@@ -396,10 +2445,342 @@ def save_state(state: dict, state_path: Path):
     )
 
 
+class JSONStateStore:
+    """Whole-document JSON state, written once at the end of a run (default)."""
+
+    def __init__(self, state_path: Path):
+        self.state_path = state_path
+
+    def load(self) -> dict:
+        return load_state(self.state_path)
+
+    def record_url(self, url: str, url_state: dict, change: Optional[dict] = None):
+        """Per-URL progress is not persisted; see SQLiteStateStore."""
+
+    def record_meta(self, key: str, value):
+        """Run metadata is written by ``save``."""
+
+    def pending_changes(self) -> list[dict]:
+        """Nothing is written before the report, so nothing is pending."""
+        return []
+
+    def clear_changes(self):
+        pass
+
+    def save(self, state: dict):
+        save_state(state, self.state_path)
+
+    def close(self):
+        pass
+
+
+class SQLiteStateStore:
+    """
+    SQLite (WAL mode) state backend.
+    Each URL row is upserted as soon as it is processed, so a crash or CI
+    timeout keeps every result fetched so far. A change found for the URL is
+    kept in ``pending_changes`` in the same transaction until its report is
+    written. ``save`` also exports the schema_version 2 JSON file, which
+    remains the git-committed state.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS urls (
+            url TEXT PRIMARY KEY,
+            section TEXT,
+            last_checked TEXT,
+            last_changed TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_urls_last_checked ON urls(last_checked);
+        CREATE INDEX IF NOT EXISTS idx_urls_section ON urls(section);
+        CREATE INDEX IF NOT EXISTS idx_urls_last_changed ON urls(last_changed);
+        CREATE TABLE IF NOT EXISTS pending_changes (
+            url TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+    """
+
+    META_KEYS = ("schema_version", "last_run", "statistics", "metrics", "checkpoint")
+
+    def __init__(self, db_path: Path, json_path: Path):
+        self.db_path = db_path
+        self.json_path = json_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def _meta(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key: str, value):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value, ensure_ascii=False)),
+        )
+
+    def _upsert(self, url: str, url_state: dict):
+        self.conn.execute(
+            "INSERT INTO urls (url, section, last_checked, last_changed, data) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET section = excluded.section, "
+            "last_checked = excluded.last_checked, last_changed = excluded.last_changed, "
+            "data = excluded.data",
+            (url, url_state.get("section"), url_state.get("last_checked"),
+             url_state.get("last_changed"), json.dumps(url_state, ensure_ascii=False)),
+        )
+
+    def _is_stale(self) -> bool:
+        """True if the database is empty or older than the JSON state file."""
+        if self._meta("schema_version") is None:
+            return True
+        if not self.json_path.exists():
+            return False
+        json_last_run = load_state(self.json_path).get("last_run")
+        db_last_run = self._meta("last_run")
+        return bool(json_last_run) and (db_last_run is None or json_last_run > db_last_run)
+
+    def load(self) -> dict:
+        if self._is_stale() and self.json_path.exists():
+            print(f"Importing {self.json_path.name} into {self.db_path.name}")
+            self.import_json(self.json_path)
+        state = {
+            "schema_version": self._meta("schema_version", 2),
+            "last_run": self._meta("last_run"),
+            "urls": {},
+            "statistics": self._meta("statistics", {}),
+        }
+        for key in ("metrics", "checkpoint"):
+            if self._meta(key):
+                state[key] = self._meta(key)
+        for url, data in self.conn.execute("SELECT url, data FROM urls ORDER BY rowid"):
+            state["urls"][url] = json.loads(data)
+        return state
+
+    def record_url(self, url: str, url_state: dict, change: Optional[dict] = None):
+        with self.conn:
+            self._upsert(url, url_state)
+            if change is not None:
+                # The new content hash hides this change from a resumed run
+                self.conn.execute(
+                    "INSERT INTO pending_changes (url, data) VALUES (?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET data = excluded.data",
+                    (url, json.dumps(change, ensure_ascii=False)),
+                )
+
+    def pending_changes(self) -> list[dict]:
+        """Changes recorded by a run that stopped before writing its report."""
+        rows = self.conn.execute("SELECT data FROM pending_changes ORDER BY rowid")
+        return [json.loads(data) for data, in rows]
+
+    def clear_changes(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM pending_changes")
+
+    def record_meta(self, key: str, value):
+        with self.conn:
+            self._set_meta(key, value)
+
+    def save(self, state: dict):
+        with self.conn:
+            for url, url_state in state["urls"].items():
+                self._upsert(url, url_state)
+            # Rows re-keyed or dropped in memory (see migrate_state_keys)
+            stale = {url for url, in self.conn.execute("SELECT url FROM urls")} - state["urls"].keys()
+            self.conn.executemany("DELETE FROM urls WHERE url = ?", [(url,) for url in stale])
+            for key in self.META_KEYS:
+                self._set_meta(key, state.get(key))
+        save_state(state, self.json_path)
+
+    def import_json(self, json_path: Path):
+        """Replace database contents with a schema_version 2 JSON state file."""
+        state = load_state(json_path)
+        with self.conn:
+            self.conn.execute("DELETE FROM urls")
+            self.conn.execute("DELETE FROM meta")
+            for url, url_state in state["urls"].items():
+                self._upsert(url, url_state)
+            for key in self.META_KEYS:
+                self._set_meta(key, state.get(key))
+
+    def export_json(self, json_path: Path):
+        """Write database contents as a schema_version 2 JSON state file."""
+        save_state(self.load(), json_path)
+
+    def close(self):
+        self.conn.close()
+
+
+def open_state_store(backend: str):
+    """Create the state store for a ``--state-backend`` value."""
+    if backend == "sqlite":
+        return SQLiteStateStore(STATE_DB_PATH, STATE_FILE_PATH)
+    return JSONStateStore(STATE_FILE_PATH)
+
+
+class SnapshotStore:
+    """
+    Content-addressed store for normalized page text.
+    Each snapshot is gzip-compressed under ``<root>/<xx>/<sha256>.txt.gz`` and
+    keyed by the same ``sha256:`` hash kept in ``content_hash``, so identical
+    pages share one file. In read-only mode (``--dry-run``) new snapshots are
+    held in memory instead of written to disk.
+    """
+
+    def __init__(self, root: Path, read_only: bool = False):
+        self.root = root
+        self.read_only = read_only
+        self._pending: dict[str, str] = {}
+
+    def _path(self, content_hash: str) -> Path:
+        digest = content_hash.split(":", 1)[-1]
+        return self.root / digest[:2] / f"{digest}.txt.gz"
+
+    def put(self, content: str) -> str:
+        """Store content and return its hash."""
+        content_hash = compute_hash(content)
+        path = self._path(content_hash)
+        if content_hash in self._pending or path.exists():
+            return content_hash
+        if self.read_only:
+            self._pending[content_hash] = content
+            return content_hash
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        # mtime=0 keeps the compressed bytes reproducible for git
+        tmp_path.write_bytes(gzip.compress(content.encode("utf-8"), mtime=0))
+        os.replace(tmp_path, path)
+        return content_hash
+
+    def get(self, content_hash: Optional[str]) -> Optional[str]:
+        """Return stored content for a hash, or None if it is unknown."""
+        if not content_hash:
+            return None
+        if content_hash in self._pending:
+            return self._pending[content_hash]
+        path = self._path(content_hash)
+        if not path.exists():
+            return None
+        try:
+            return gzip.decompress(path.read_bytes()).decode("utf-8")
+        except (OSError, EOFError) as e:
+            logger.warning(f"Unreadable snapshot {path}: {e}")
+            return None
+
+    def import_from(self, root: Path) -> int:
+        """Copy in snapshots from another store's directory. Returns count added."""
+        added = 0
+        for path in root.glob("*/*.txt.gz"):
+            target = self.root / path.parent.name / path.name
+            if target.exists():
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, target.with_suffix(".tmp"))
+            os.replace(target.with_suffix(".tmp"), target)
+            added += 1
+        return added
+
+    def prune(self, keep: set) -> int:
+        """Delete snapshots whose hash is not in ``keep``. Returns count removed."""
+        if self.read_only or not self.root.exists():
+            return 0
+        keep_digests = {h.split(":", 1)[-1] for h in keep if h}
+        removed = 0
+        for path in self.root.glob("*/*.txt.gz"):
+            if path.name[:-len(".txt.gz")] not in keep_digests:
+                path.unlink()
+                removed += 1
+        return removed
+
+
+def previous_content(url_state: dict, snapshots: SnapshotStore) -> str:
+    """
+    Return the last extracted text for a URL (inline legacy field or
+    snapshot), before any boilerplate stripping.
+    """
+    return (url_state.get("normalized_content")
+            or snapshots.get(url_state.get("snapshot_hash") or url_state.get("content_hash"))
+            or "")
+
+
+def externalize_snapshots(state: dict, snapshots: SnapshotStore) -> int:
+    """
+    Move inline ``normalized_content`` (schema 2 state files written before
+    the snapshot store existed) into the store. Returns count migrated.
+    """
+    migrated = 0
+    for url_state in state["urls"].values():
+        content = url_state.pop("normalized_content", None)
+        if content is None:
+            continue
+        stored_hash = snapshots.put(content)
+        if url_state.get("content_hash") != stored_hash:
+            # Hand-edited state (e.g. a simulated change) - keep it inline
+            url_state["normalized_content"] = content
+            continue
+        migrated += 1
+    return migrated
+
+
+def referenced_snapshots(state: dict) -> set:
+    """Snapshot hashes referenced by the state file, including held-back diff bases."""
+    current = {u.get("snapshot_hash") or u.get("content_hash") for u in state["urls"].values()}
+    return (current | {u.get("diff_base") for u in state["urls"].values()}) - {None}
+
+
+def build_boilerplate(state: dict, snapshots: SnapshotStore,
+                      threshold: float = BOILERPLATE_THRESHOLD) -> BoilerplateModel:
+    """Learn a boilerplate model from every URL's last snapshot."""
+    texts = (previous_content(url_state, snapshots) for url_state in state["urls"].values())
+    return BoilerplateModel.build((t for t in texts if t), threshold)
+
+
+def generate_boilerplate_report(model: BoilerplateModel,
+                                previous: Optional[BoilerplateModel] = None) -> str:
+    """Markdown listing the lines a boilerplate model strips."""
+    previous_lines = {**previous.lines, **previous.edge_lines} if previous else {}
+    model_lines = {**model.lines, **model.edge_lines}
+    lines = [
+        "# Learn Monitor Boilerplate Model",
+        "",
+        f"**Built:** {model.built}",
+        f"**Pages:** {model.pages}",
+        f"**Threshold:** lines on more than {model.threshold:.0%} of pages",
+        f"**Lines stripped:** {len(model.lines)} anywhere, {len(model.edge_lines)} outside the main content only",
+        "",
+    ]
+    if model.pages < BOILERPLATE_MIN_PAGES:
+        lines.extend([f"Fewer than {BOILERPLATE_MIN_PAGES} pages - no lines are stripped.", ""])
+    if model_lines:
+        lines.extend(["| Line | Pages | Stripped | Status |", "|------|-------|----------|--------|"])
+        for found, where in ((model.lines, "anywhere"), (model.edge_lines, "outside content")):
+            for line, count in found.items():
+                marker = "" if line in previous_lines else "new"
+                cell = line.replace('|', '\\|')
+                lines.append(f"| `{cell}` | {count} | {where} | {marker} |")
+        lines.append("")
+    kept = [line for line in previous_lines if line not in model_lines]
+    if kept:
+        lines.extend(["## No Longer Stripped", ""])
+        lines.extend(f"- `{line}`" for line in kept)
+        lines.append("")
+    return "\n".join(lines)
+
+
 # === Report Generation ===
 def generate_report(changes: list[ChangeRecord], redirects: list[dict],
-                    errors: list[dict], run_time: str, total_urls: int) -> str:
+                    errors: list[dict], run_time: str, total_urls: int,
+                    deferred: Optional[list[dict]] = None, scheduled_later: int = 0) -> str:
     """Generate markdown change report."""
+    deferred = deferred or []
     meaningful = [c for c in changes if c.classification == 'meaningful']
     minor = [c for c in changes if c.classification == 'minor']
 
@@ -416,10 +2797,16 @@ def generate_report(changes: list[ChangeRecord], redirects: list[dict],
         f"**Minor Changes:** {len(minor)}",
         f"**Redirects:** {len(redirects)}",
         f"**Errors:** {len(errors)}",
+    ]
+    if deferred:
+        lines.append(f"**Deferred to Next Run:** {len(deferred)}")
+    if scheduled_later:
+        lines.append(f"**Not Due This Run (--schedule):** {scheduled_later}")
+    lines.extend([
         "",
         "---",
         "",
-    ]
+    ])
 
     # Summary table
     if changes:
@@ -430,7 +2817,7 @@ def generate_report(changes: list[ChangeRecord], redirects: list[dict],
             "|----------|-------|-----------------|",
         ])
         if critical_count:
-            lines.append(f"| CRITICAL | {critical_count} | Playbook portal-walkthrough.md needs update |")
+            lines.append(f"| CRITICAL | {critical_count} | Portal walkthrough, deprecation or breaking change - update docs |")
         if high_count:
             lines.append(f"| HIGH | {high_count} | Control/playbook may need review |")
         if len(minor):
@@ -443,7 +2830,8 @@ def generate_report(changes: list[ChangeRecord], redirects: list[dict],
         lines.extend([
             "## CRITICAL: Playbook Updates Required",
             "",
-            "These changes affect step-by-step procedures and must be addressed.",
+            "These changes affect step-by-step procedures, or deprecate features the docs cite, "
+            "and must be addressed.",
             "",
         ])
         for i, c in enumerate(critical_changes, 1):
@@ -501,6 +2889,19 @@ def generate_report(changes: list[ChangeRecord], redirects: list[dict],
     else:
         lines.extend(["## Errors", "", "No errors detected.", ""])
 
+    # Deferred URLs
+    if deferred:
+        lines.extend([
+            "## Deferred URLs",
+            "",
+            "Not checked in this run; they will be checked first on the next run.",
+            "",
+        ])
+        for d in deferred:
+            reason = f" ({d['reason']})" if d.get('reason') else ""
+            lines.append(f"- **{d['topic']}**: {d['url']}{reason}")
+        lines.append("")
+
     lines.extend([
         "---",
         "",
@@ -520,6 +2921,11 @@ def _format_change(c: ChangeRecord, index: int) -> list[str]:
         f"**Classification:** {c.classification.title()} ({c.reason})",
         "",
     ]
+    if c.changed_sections:
+        lines.insert(-1, f"**Changed Sections:** {'; '.join(c.changed_sections)}")
+    if len(c.categories) > 1:
+        matched = ", ".join(f"{name} ({count})" for name, count in c.categories.items())
+        lines.insert(-1, f"**Matched Patterns:** {matched}")
 
     if c.affected_playbooks:
         lines.append("**Affected Playbooks:**")
@@ -546,30 +2952,69 @@ def _format_change(c: ChangeRecord, index: int) -> list[str]:
     return lines
 
 
+def report_path_for(run_time: str) -> Path:
+    """
+    Dated report path. A later report on the same day (for example from a
+    resumed run) gets a part suffix instead of overwriting the earlier one.
+    """
+    date = run_time[:10]
+    path = REPORTS_DIR / f"learn-changes-{date}.md"
+    part = 2
+    while path.exists():
+        path = REPORTS_DIR / f"learn-changes-{date}-part{part}.md"
+        part += 1
+    return path
+
+
 # === Debug Functions ===
-def _debug_single_url(url: str):
+def _debug_single_url(url: str, record: Optional[Path] = None, replay: Optional[Path] = None,
+                      extractor: str = "auto", cache: Optional[HTTPCache] = None,
+                      transport: str = "requests"):
     """Debug a single URL - useful for troubleshooting."""
     print(f"\nDebug mode: checking single URL")
     print(f"URL: {url}")
     print("=" * 60)
 
-    session = requests.Session()
-    session.headers["User-Agent"] = "FSI-AgentGov-Monitor/1.0"
+    session = create_session(workers=1, record=record, replay=replay, cache=cache,
+                             transport=transport)
 
     print("\n1. Fetching page...")
     result = fetch_page(url, session)
+    session.close()
     print(f"   Status: {result.status_code}")
+    if result.from_cache:
+        print(f"   HTTP cache: {result.from_cache}")
+    elif result.http_version:
+        print(f"   Transfer: {result.http_version}, {result.wire_bytes} bytes on the wire, "
+              f"{result.decoded_bytes} decoded")
+    if result.timings:
+        print("   Timing: " + ", ".join(f"{stage} {seconds * 1000:.0f} ms"
+                                      for stage, seconds in result.timings.items()))
     print(f"   Final URL: {result.final_url}")
     print(f"   Redirected: {result.was_redirected}")
     if result.error:
         print(f"   Error: {result.error}")
         return
+    if result.head_meta:
+        for name, value in result.head_meta.items():
+            print(f"   {name}: {value}")
 
     print(f"   Content length: {len(result.content)} bytes")
 
     print("\n2. Extracting content...")
     try:
-        normalized = extract_main_content(result.content)
+        if extractor == "bs4" or lxml_etree is None:
+            print("   Extractor: bs4")
+        elif _extract_page_lxml(result.content) is None:
+            print("   Extractor: bs4 (markup lxml might read differently)")
+        else:
+            print("   Extractor: lxml")
+        normalized = extract_main_content(result.content, extractor)
+        boilerplate = BoilerplateModel.load(BOILERPLATE_PATH) or BoilerplateModel()
+        stripped = boilerplate.strip(normalized)
+        if stripped != normalized:
+            print(f"   Boilerplate stripped: {len(normalized) - len(stripped)} chars")
+            normalized = stripped
         print(f"   Normalized length: {len(normalized)} chars")
         print(f"   First 500 chars:\n   ---")
         print("   " + normalized[:500].replace("\n", "\n   "))
@@ -594,20 +3039,27 @@ def _debug_single_url(url: str):
 
     print("\n5. State check...")
     state = load_state(STATE_FILE_PATH)
+    snapshots = SnapshotStore(SNAPSHOT_DIR, read_only=True)
     if url in state.get("urls", {}):
         old_state = state["urls"][url]
         print(f"   Found in state file")
         print(f"   Last checked: {old_state.get('last_checked', 'unknown')}")
         print(f"   Last changed: {old_state.get('last_changed', 'unknown')}")
-        if old_state.get("content_hash") == content_hash:
+        old_content = boilerplate.strip(previous_content(old_state, snapshots))
+        if old_state.get("content_hash") == content_hash or \
+                (old_content and compute_hash(old_content) == content_hash):
             print("   Content: UNCHANGED")
         else:
             print("   Content: CHANGED")
-            if old_state.get("normalized_content"):
-                classification, reason, diff_text = classify_change(
-                    old_state["normalized_content"], normalized
-                )
+            if old_state.get("simhash"):
+                distance = simhash_distance(old_state["simhash"], compute_simhash(normalized))
+                print(f"   SimHash distance: {distance} (noise at <= {SIMHASH_DISTANCE})")
+            if old_content:
+                classification, reason, diff_text, categories = classify_change(old_content,
+                                                                                normalized)
                 print(f"   Classification: {classification} ({reason})")
+                for category, count in categories.items():
+                    print(f"     - {category}: {count}")
     else:
         print("   Not found in state file (new URL)")
 
@@ -632,6 +3084,17 @@ Examples:
   python scripts/learn_monitor.py                    # Normal run
   python scripts/learn_monitor.py --dry-run          # Test without saving
   python scripts/learn_monitor.py --limit 5 --debug  # Debug with 5 URLs
+  python scripts/learn_monitor.py --workers 8 --rate 4  # Faster, still polite
+  python scripts/learn_monitor.py --workers 8 --transport httpx  # HTTP/2, fewer TLS handshakes
+  python scripts/learn_monitor.py --time-budget 10m     # Stop after 10 minutes, resume next run
+  python scripts/learn_monitor.py --dry-run --replay cassettes/2026-01-26  # Offline rerun
+  python scripts/learn_monitor.py --dry-run --http-cache --cache-ttl 4h  # Tune patterns, fetch once
+  python scripts/learn_monitor.py --build-boilerplate   # Relearn page chrome to strip
+  python scripts/learn_monitor.py --diff URL            # Show a near-duplicate change's diff
+  python scripts/learn_monitor.py --schedule --max-requests 60  # Only URLs due, 60 at most
+  python scripts/learn_monitor.py --apply-redirects --dry-run  # Diff of moved-page link fixes
+  python scripts/learn_monitor.py --shard 2/8        # One CI matrix job's share of the URLs
+  python scripts/learn_monitor.py --merge-shards     # Combine the shard outputs and report
         """
     )
     parser.add_argument("--dry-run", action="store_true",
@@ -644,6 +3107,85 @@ Examples:
                        help="Enable debug output (very verbose)")
     parser.add_argument("--url", type=str,
                        help="Check a single URL (for debugging)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                       help=f"Concurrent fetch workers (default: {MAX_WORKERS}, 1 = sequential)")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND,
+                       help=f"Max requests per second across all workers "
+                            f"(default: {REQUESTS_PER_SECOND}, 0 = unlimited)")
+    parser.add_argument("--per-host", type=int, default=MAX_PER_HOST,
+                       help=f"Max concurrent requests per host (default: {MAX_PER_HOST})")
+    parser.add_argument("--state-backend", choices=["json", "sqlite"], default="json",
+                       help="Where run state is kept (sqlite saves each URL as it is processed)")
+    parser.add_argument("--export-state", action="store_true",
+                       help="Export the SQLite state to learn-monitor-state.json and exit")
+    parser.add_argument("--time-budget", type=parse_duration, metavar="DURATION",
+                       help="Stop cleanly after this long (e.g. 600, 10m, 1h); "
+                            "the next run resumes with the remaining URLs")
+    parser.add_argument("--processes", type=int, default=ANALYSIS_PROCESSES,
+                       help=f"Worker processes for extract/hash/classify "
+                            f"(default: {ANALYSIS_PROCESSES}, 0 = in the main process)")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="requests",
+                       help="HTTP client: requests (urllib3, HTTP/1.1) or httpx (optional "
+                            "package; HTTP/2 multiplexing when h2 is installed)")
+    parser.add_argument("--pool-size", type=int, metavar="N",
+                       help="Pooled connections per host (default: --workers)")
+    parser.add_argument("--keepalive", type=float, default=KEEPALIVE_EXPIRY, metavar="SECONDS",
+                       help=f"Seconds an idle connection stays pooled, httpx transport "
+                            f"(default: {KEEPALIVE_EXPIRY:g})")
+    parser.add_argument("--head-probe", action="store_true",
+                       help="Read only <head> and skip pages whose ms.date/updated_at/"
+                            "commit metadata is unchanged")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", type=Path, metavar="DIR",
+                          help="Record every HTTP response to a cassette directory")
+    cassette.add_argument("--replay", type=Path, metavar="DIR",
+                          help="Serve HTTP responses from a recorded cassette (no network)")
+    parser.add_argument("--http-cache", action="store_true",
+                       help="Serve repeat requests from the shared on-disk HTTP cache "
+                            "(data/http-cache; also applies to --url)")
+    parser.add_argument("--cache-ttl", type=parse_duration, default=DEFAULT_TTL, metavar="DURATION",
+                       help=f"With --http-cache, how long a response without Cache-Control "
+                            f"max-age or Expires stays fresh (default: {DEFAULT_TTL}s)")
+    parser.add_argument("--restart", action="store_true",
+                       help="Ignore an unfinished run's checkpoint and check every URL")
+    parser.add_argument("--build-boilerplate", action="store_true",
+                       help="Relearn the boilerplate model from stored snapshots, "
+                            "report the lines it strips, and exit")
+    parser.add_argument("--boilerplate-threshold", type=float, default=BOILERPLATE_THRESHOLD,
+                       help=f"Share of pages a line must appear on to count as boilerplate "
+                            f"(default: {BOILERPLATE_THRESHOLD})")
+    parser.add_argument("--schedule", action="store_true",
+                       help="Check only URLs due by their observed change rate "
+                            "(portal-walkthrough URLs at least every "
+                            f"{SCHEDULE_CRITICAL_MAX_INTERVAL:g} days, others every "
+                            f"{SCHEDULE_MAX_INTERVAL:g})")
+    parser.add_argument("--max-requests", type=int, metavar="N",
+                       help="Check at most N URLs this run, most overdue first")
+    parser.add_argument("--simhash-distance", type=int, default=SIMHASH_DISTANCE, metavar="BITS",
+                       help=f"Label changes within this SimHash distance of the previous text "
+                            f"as noise without diffing them, unless an added or removed line "
+                            f"looks meaningful (default: {SIMHASH_DISTANCE}, 0 = off)")
+    parser.add_argument("--diff", type=str, metavar="URL",
+                       help="Print the diff held back for a URL's near-duplicate change and exit")
+    parser.add_argument("--apply-redirects", action="store_true",
+                       help="Rewrite the watchlist and docs links to remembered redirect "
+                            "targets and exit (with --dry-run, print the diff only)")
+    shard = parser.add_mutually_exclusive_group()
+    shard.add_argument("--shard", type=parse_shard, metavar="I/N",
+                       help="Check only shard I of N (stable split by URL hash) and write a "
+                            "partial state to --shard-dir instead of the state file")
+    shard.add_argument("--merge-shards", action="store_true",
+                       help="Merge the --shard outputs in --shard-dir into the state file "
+                            "and one report, and exit")
+    parser.add_argument("--shard-dir", type=Path, default=SHARD_DIR, metavar="DIR",
+                       help="Where --shard writes and --merge-shards reads shard outputs "
+                            "(default: data/learn-monitor-shards)")
+    parser.add_argument("--metrics-textfile", type=Path, metavar="PATH",
+                        help="Also write the run's metrics in Prometheus text format "
+                             "(for node_exporter's textfile collector)")
+    parser.add_argument("--extractor", choices=EXTRACTORS, default="auto",
+                       help="HTML parser for content extraction: lxml (optional package, "
+                            "faster), bs4, or auto = lxml when installed (default: auto)")
     args = parser.parse_args()
 
     # Setup logging
@@ -671,12 +3213,244 @@ Examples:
         sys.exit(2)
 
 
+def _build_boilerplate(args):
+    """Relearn the boilerplate model from the stored snapshots."""
+    store = open_state_store(args.state_backend)
+    state = store.load()
+    store.close()
+    previous = BoilerplateModel.load(BOILERPLATE_PATH)
+    model = build_boilerplate(state, SnapshotStore(SNAPSHOT_DIR, read_only=True),
+                              args.boilerplate_threshold)
+    report = generate_boilerplate_report(model, previous)
+
+    print(f"Learned from {model.pages} pages: {len(model.lines)} boilerplate lines, "
+          f"{len(model.edge_lines)} more outside the main content (on more than {model.threshold:.0%} of pages)")
+    for line, count in model.lines.items():
+        print(f"  {count:>5}  {line[:70]}")
+    for line, count in model.edge_lines.items():
+        print(f"  {count:>5}  {line[:70]}  (outside content)")
+
+    if args.dry_run:
+        print("\nDry run - model not saved")
+        sys.exit(0)
+
+    model.save(BOILERPLATE_PATH)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    report_path = REPORTS_DIR / f"boilerplate-{datetime.now().strftime('%Y-%m-%d')}.md"
+    report_path.write_text(report, encoding="utf-8")
+    print(f"\nModel saved to {BOILERPLATE_PATH}")
+    print(f"Report saved to {report_path}")
+    sys.exit(0)
+
+
+def _show_diff(url: str, state_backend: str):
+    """Print the diff held back when a URL's last change was a near-duplicate."""
+    store = open_state_store(state_backend)
+    state = store.load()
+    store.close()
+    url_state = state["urls"].get(url) or state["urls"].get(canonical_learn_url(url))
+    if url_state is None:
+        print(f"ERROR: {url} is not in the state file")
+        sys.exit(2)
+
+    snapshots = SnapshotStore(SNAPSHOT_DIR, read_only=True)
+    old_content = snapshots.get(url_state.get("diff_base"))
+    if old_content is None:
+        print(f"No held-back diff for {url}: its last change was diffed in full")
+        sys.exit(0)
+
+    boilerplate = BoilerplateModel.load(BOILERPLATE_PATH) or BoilerplateModel()
+    old_lines = boilerplate.strip(old_content).splitlines(keepends=True)
+    new_lines = boilerplate.strip(previous_content(url_state, snapshots)).splitlines(keepends=True)
+    print(f"Changed {url_state.get('last_changed', 'unknown')}\n")
+    for line in unified_diff(old_lines, new_lines):
+        print(line, end='' if line.endswith('\n') else '\n')
+    sys.exit(0)
+
+
+def _write_shard(args, state: dict, shard_urls: set, base_run: Optional[str], run_started: str,
+                 changes: list[ChangeRecord], redirects: list[dict], errors: list[dict],
+                 deferred: list[dict]):
+    """Write a --shard run's partial state and change list for --merge-shards."""
+    shard_index, shard_count = args.shard
+    meaningful = [c for c in changes if c.classification == 'meaningful']
+    print("\n" + "=" * 50)
+    print(f"Shard {shard_index}/{shard_count}: {len(meaningful)} meaningful changes, "
+          f"{len(errors)} errors, {len(deferred)} deferred")
+    if args.dry_run:
+        print("\nDry run - shard output not saved")
+        sys.exit(0)
+
+    path = shard_path(args.shard_dir, shard_index, shard_count)
+    save_state({
+        "shard": {"index": shard_index, "count": shard_count},
+        "base_run": base_run,
+        "run_started": run_started,
+        "run_time": state["last_run"],
+        "urls": {url: url_state for url, url_state in state["urls"].items() if url in shard_urls},
+        "changes": [asdict(c) for c in changes],
+        "redirects": redirects,
+        "errors": errors,
+        "deferred": deferred,
+        "statistics": {k: v for k, v in state["statistics"].items() if k != "total_urls"},
+        "metrics": state["metrics"],
+    }, path)
+    print(f"Shard output saved to {path} - combine with --merge-shards")
+    sys.exit(0)
+
+
+def _merge_shards(args):
+    """Combine --shard outputs into the state file and one report."""
+    shards = load_shards(args.shard_dir) if args.shard_dir.exists() else []
+    if not shards:
+        print(f"ERROR: No shard outputs in {args.shard_dir}")
+        sys.exit(2)
+
+    store = open_state_store(args.state_backend)
+    state = store.load()
+    is_baseline = state["last_run"] is None
+    entries = load_watchlist(WATCHLIST_PATH)
+    migrate_state_keys(state, entries)
+    merge = merge_shards(state, shards, entries)
+    if merge.conflicts:
+        store.close()
+        print(f"ERROR: {len(merge.conflicts)} conflicts - state not changed:")
+        for conflict in merge.conflicts:
+            print(f"  {conflict}")
+        sys.exit(2)
+
+    print(f"Merged {len(merge.paths)} shard outputs from {args.shard_dir}")
+    for index in merge.missing:
+        print(f"  WARNING: no output for shard {index} - its URLs are deferred to the next run")
+
+    if not args.dry_run:
+        snapshots = SnapshotStore(SNAPSHOT_DIR)
+        added = sum(snapshots.import_from(path.parent / "snapshots") for path in merge.paths)
+        logger.debug(f"Imported {added} shard snapshots")
+        externalize_snapshots(state, snapshots)
+        with merge.metrics.timer("save"):
+            store.save(state)
+        pruned = snapshots.prune(referenced_snapshots(state))
+        logger.debug(f"Pruned {pruned} unreferenced snapshots")
+        # Merged outputs would conflict with the new state on the next merge
+        for path in merge.paths:
+            path.unlink()
+            shutil.rmtree(path.parent / "snapshots", ignore_errors=True)
+        print(f"State saved to {STATE_FILE_PATH}")
+    store.close()
+    if args.metrics_textfile:
+        write_metrics_textfile(args.metrics_textfile, {**state, "metrics": merge.metrics.as_dict()})
+
+    meaningful = [c for c in merge.changes if c.classification == 'meaningful']
+    stats = merge.statistics
+    print(f"Meaningful changes: {len(meaningful)}")
+    print(f"Minor changes: {stats.get('last_run_minor_changes', 0)}")
+    print(f"Errors: {len(merge.errors)}")
+    if merge.deferred:
+        print(f"Deferred: {len(merge.deferred)}")
+
+    if is_baseline:
+        print("\nBaseline established. No report generated on first run.")
+        sys.exit(0)
+
+    if meaningful or merge.errors:
+        report = generate_report(merge.changes, merge.redirects, merge.errors, merge.run_time,
+                                 stats.get("last_run_checked", 0), merge.deferred,
+                                 stats.get("last_run_scheduled_later", 0))
+        report_path = report_path_for(merge.run_time)
+        if not args.dry_run:
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            report_path.write_text(report, encoding='utf-8')
+            print(f"Report saved to {report_path}")
+        print(f"\n{len(meaningful)} meaningful changes detected - exit code 1 for CI")
+        sys.exit(1)
+    print("\nNo meaningful changes detected")
+    sys.exit(0)
+
+
+def _apply_redirects(args):
+    """Rewrite the watchlist and docs links to remembered redirect targets."""
+    store = open_state_store(args.state_backend)
+    state = store.load()
+    entries = load_watchlist(WATCHLIST_PATH)
+    migrate_state_keys(state, entries)
+    redirects = redirect_map(state, entries)
+    if not redirects:
+        store.close()
+        print("No remembered redirects - nothing to rewrite")
+        sys.exit(0)
+
+    rewrites = plan_redirect_rewrites(redirects, DOCS_DIR)
+    for path, text, new_text, _ in rewrites:
+        name = path.relative_to(DOCS_DIR.parent).as_posix()
+        diff = difflib.unified_diff(text.splitlines(keepends=True),
+                                    new_text.splitlines(keepends=True),
+                                    fromfile=f"a/{name}", tofile=f"b/{name}")
+        for line in diff:
+            print(line, end='' if line.endswith('\n') else '\n')
+    replaced = sum(count for *_, count in rewrites)
+    print(f"\n{len(redirects)} redirected URLs: {replaced} links in {len(rewrites)} files")
+
+    if args.dry_run:
+        store.close()
+        print("Dry run - no files changed")
+        sys.exit(0)
+
+    for path, _, new_text, _ in rewrites:
+        path.write_bytes(new_text.encode("utf-8"))
+    # The watchlist now names the final URLs; carry their history across
+    for entry in entries:
+        if entry.url not in redirects:
+            continue
+        url_state = state["urls"].pop(entry.url)
+        url_state.pop("final_url", None)
+        url_state.pop("redirect_checked", None)
+        state["urls"].setdefault(canonical_learn_url(redirects[entry.url]), url_state)
+    store.save(state)
+    store.close()
+    print(f"Files rewritten; state saved to {STATE_FILE_PATH}")
+    sys.exit(0)
+
+
 def _run_monitor(args):
     """Internal monitor implementation."""
 
+    if args.extractor == "lxml" and lxml_etree is None:
+        print("ERROR: --extractor lxml needs the lxml package (pip install lxml)")
+        sys.exit(2)
+    if args.transport == "httpx" and httpx is None:
+        print("ERROR: --transport httpx needs the httpx package (pip install 'httpx[http2]')")
+        sys.exit(2)
+
+    http_cache = HTTPCache(ttl=args.cache_ttl) if args.http_cache else None
+
     # Handle single URL mode for debugging
     if args.url:
-        return _debug_single_url(args.url)
+        return _debug_single_url(args.url, record=args.record, replay=args.replay,
+                                 extractor=args.extractor, cache=http_cache,
+                                 transport=args.transport)
+
+    if args.export_state:
+        store = SQLiteStateStore(STATE_DB_PATH, STATE_FILE_PATH)
+        store.export_json(STATE_FILE_PATH)
+        store.close()
+        print(f"Exported {STATE_DB_PATH} to {STATE_FILE_PATH}")
+        sys.exit(0)
+
+    if args.build_boilerplate:
+        return _build_boilerplate(args)
+
+    if args.diff:
+        return _show_diff(args.diff, args.state_backend)
+
+    if args.merge_shards:
+        return _merge_shards(args)
+
+    if args.apply_redirects:
+        return _apply_redirects(args)
+
+    metrics = RunMetrics()
+    run_clock = time.perf_counter()
 
     # 1. Parse watchlist
     if not WATCHLIST_PATH.exists():
@@ -685,160 +3459,403 @@ def _run_monitor(args):
         sys.exit(2)
 
     try:
-        url_entries = parse_watchlist(WATCHLIST_PATH)
+        url_entries = load_watchlist(WATCHLIST_PATH)
     except Exception as e:
         logger.error(f"Failed to parse watchlist: {e}")
         logger.debug(traceback.format_exc())
         sys.exit(2)
+    watchlist = url_entries
 
-    print(f"Found {len(url_entries)} Learn URLs in watchlist")
+    listed = sum(len(e.listings) for e in url_entries)
+    print(f"Found {len(url_entries)} distinct Learn URLs in watchlist"
+          + (f" ({listed} listings)" if listed != len(url_entries) else ""))
     logger.debug(f"First 3 URLs: {[e.url for e in url_entries[:3]]}")
 
+    if args.shard:
+        shard_index, shard_count = args.shard
+        url_entries = [e for e in url_entries if shard_of(e.url, shard_count) == shard_index]
+        shard_urls = {e.url for e in url_entries}
+        print(f"Shard {shard_index}/{shard_count}: {len(url_entries)} URLs")
+
     if args.limit:
         url_entries = url_entries[:args.limit]
         print(f"Limited to {args.limit} URLs for testing")
 
-    # 2. Load state
-    state = load_state(STATE_FILE_PATH)
+    # 2. Load state (read-only for a shard; --merge-shards writes it)
+    persist = not args.dry_run and not args.shard
+    store = open_state_store(args.state_backend)
+    state = store.load()
+    base_run = state["last_run"]
+    moved = migrate_state_keys(state, watchlist)
+    if moved:
+        print(f"Moved state for {moved} watchlist spellings to their canonical URLs")
+    if args.shard:
+        # New snapshots travel with the shard output; old ones are read from SNAPSHOT_DIR
+        snapshots = SnapshotStore(args.shard_dir / "snapshots", read_only=args.dry_run)
+    else:
+        snapshots = SnapshotStore(SNAPSHOT_DIR, read_only=args.dry_run)
     is_baseline = state["last_run"] is None
     if is_baseline:
         print("First run - establishing baseline (no report will be generated)")
 
+    # Changes an interrupted run recorded but never reported (SQLite backend)
+    changes: list[ChangeRecord] = []
+    if not args.shard:
+        changes = [ChangeRecord(**c) for c in store.pending_changes()]
+        if changes:
+            print(f"Carrying {len(changes)} changes from an interrupted run into this report")
+
+    now = datetime.now(timezone.utc).isoformat()
+    watchlist_size = len(url_entries)
+
+    # Resume an unfinished run: URLs checked since it started are done
+    checkpoint = None if args.restart else state.get("checkpoint")
+    if checkpoint:
+        started = checkpoint["started"]
+        url_entries = [e for e in url_entries
+                       if state["urls"].get(e.url, {}).get("last_checked", "") < started]
+        print(f"Resuming run started {started}: "
+              f"{watchlist_size - len(url_entries)} URLs already checked, "
+              f"{len(url_entries)} remaining")
+    run_started = checkpoint["started"] if checkpoint else now
+    if persist:
+        # Lets an interrupted SQLite-backed run resume (no-op for JSON)
+        store.record_meta("checkpoint", {"started": run_started})
+
+    # Adaptive schedule: only URLs due for a check, most overdue first
+    docs_index: Optional[DocsLinkIndex] = None  # built on the first change
+    scheduled_later = 0
+    if args.schedule or args.max_requests is not None:
+        docs_index = DocsLinkIndex.build(DOCS_DIR)
+        planned, due = plan_checks(url_entries, state["urls"], datetime.fromisoformat(now),
+                                   critical_urls(docs_index, url_entries),
+                                   due_only=args.schedule, max_requests=args.max_requests)
+        scheduled_later = len(url_entries) - len(planned)
+        print(f"Schedule: {due} of {len(url_entries)} URLs due, checking {len(planned)}")
+        url_entries = planned
+
+    deadline = None
+    if args.time_budget:
+        deadline = time.monotonic() + args.time_budget
+        print(f"Time budget: {args.time_budget:.0f}s")
+
     # 3. Check each URL
-    session = requests.Session()
-    session.headers["User-Agent"] = "FSI-AgentGov-Monitor/1.0 (+https://github.com/judeper/FSI-AgentGov)"
+    session = create_session(workers=args.workers, record=args.record, replay=args.replay,
+                             cache=http_cache, transport=args.transport,
+                             pool_size=args.pool_size, keepalive=args.keepalive)
+    if args.replay:
+        args.rate = 0  # nothing to be polite to
+        print(f"Replaying responses from {args.replay}")
+    limiter = FetchLimiter(rate=args.rate, burst=max(REQUEST_BURST, args.workers),
+                           per_host=args.per_host)
+    logger.debug(f"Fetching with {args.workers} workers at {args.rate} req/s "
+                 f"over {args.transport}")
+
+    def stop_reason() -> Optional[str]:
+        if limiter.circuit_open:
+            return "Circuit open: Learn is throttling or failing"
+        if deadline is not None and time.monotonic() >= deadline:
+            return "Time budget exhausted"
+        return None
+
+    def fetch(entry: URLEntry) -> FetchResult:
+        url_state = state["urls"].get(entry.url)
+        target = remembered_redirect(url_state or {}, datetime.fromisoformat(now))
+        if target:
+            result = fetch_page(target, session, limiter, validators=url_state,
+                                deadline=deadline, head_probe=args.head_probe)
+            if result.status_code == 200 or result.not_modified or result.deferred:
+                return replace(result, url=entry.url, was_redirected=True, remembered=True)
+            # The page moved again or is gone: ask the watchlist URL
+        return fetch_page(entry.url, session, limiter, validators=url_state,
+                          deadline=deadline, head_probe=args.head_probe)
+
+    # Extraction, hashing and classification hold the GIL, so they run in a
+    # process pool; --processes 0 runs them inline.
+    pool = ProcessPoolExecutor(max_workers=args.processes) if args.processes > 0 else None
+    boilerplate = BoilerplateModel.load(BOILERPLATE_PATH)
+    if boilerplate and boilerplate.fingerprint:
+        print(f"Stripping {len(boilerplate.lines) + len(boilerplate.edge_lines)} boilerplate lines "
+              f"(model built {boilerplate.built[:10]})")
+
+    def submit_analysis(entry: URLEntry, result: FetchResult) -> Optional[Future]:
+        url_state = state["urls"].get(entry.url, {})
+        if result.deferred or result.status_code != 200 or unchanged_by_validators(result, url_state):
+            return None
+        previous = {k: url_state[k] for k in PREVIOUS_CONTENT_FIELDS if k in url_state}
+        job = (result.content, previous, str(SNAPSHOT_DIR), boilerplate, args.extractor,
+               args.simhash_distance)
+        if pool:
+            return pool.submit(analyze_page, *job)
+        future: Future = Future()
+        future.set_result(analyze_page(*job))
+        return future
+
+    stages = analyze_all(
+        fetch_all(url_entries, fetch, args.workers,
+                  should_stop=lambda: stop_reason() is not None),
+        submit_analysis,
+        window=max(args.workers, args.processes) * 2,
+    )
 
-    changes: list[ChangeRecord] = []
     redirects: list[dict] = []
     errors: list[dict] = []
-    now = datetime.now(timezone.utc).isoformat()
+    deferred: list[dict] = []
+    processed = 0
+    transfer: dict[str, list[int]] = defaultdict(lambda: [0, 0, 0])  # version -> requests, wire, decoded
 
-    for i, entry in enumerate(url_entries):
+    for i, (entry, result, analysis) in enumerate(stages):
         print(f"[{i+1}/{len(url_entries)}] {entry.topic[:50]}...")
-
-        result = fetch_page(entry.url, session)
-
-        # Handle errors
-        if result.status_code != 200:
-            if result.error:
-                print(f"  ERROR: {result.error}")
-            else:
-                print(f"  ERROR: HTTP {result.status_code}")
-
-            errors.append({
-                'url': entry.url,
-                'topic': entry.topic,
-                'status': result.status_code,
-                'error': result.error,
-            })
-
-            # Preserve previous state if exists
-            if entry.url in state["urls"]:
-                state["urls"][entry.url]["last_checked"] = now
-                state["urls"][entry.url]["last_status"] = result.status_code
-
-            time.sleep(REQUEST_DELAY)
+        processed += 1
+        if result.timings and not result.from_cache:
+            # A response came over the network (or from a --replay cassette): one
+            # source for the transfer totals, the statistics and the metrics
+            version = result.http_version or "unknown"
+            counts = transfer[version]
+            counts[0] += 1
+            counts[1] += result.wire_bytes
+            counts[2] += result.decoded_bytes
+            logger.debug(f"  {version}: {result.wire_bytes} bytes on the wire, "
+                         f"{result.decoded_bytes} decoded")
+            for stage, seconds in result.timings.items():
+                metrics.observe(f"fetch_{stage}", seconds)
+            metrics.observe_page(entry.url, result.timings["ttfb"] + result.timings["download"])
+            if result.decoded_bytes:
+                metrics.observe_bytes("wire", result.wire_bytes)
+                metrics.observe_bytes("decoded", result.decoded_bytes)
+        if analysis is not None:
+            for stage, seconds in analysis.timings.items():
+                metrics.observe(stage, seconds)
+
+        if result.deferred:
+            print(f"  DEFERRED: {result.error}")
+            deferred.append({'url': entry.url, 'topic': entry.topic, 'reason': result.error})
             continue
 
-        # Track redirects
-        if result.was_redirected:
-            print(f"  Redirected to: {result.final_url}")
-            redirects.append({
-                'original': entry.url,
-                'final': result.final_url,
-                'topic': entry.topic,
-            })
+        change: Optional[ChangeRecord] = None
+        try:
+            # Handle errors
+            if result.status_code != 200 and not result.not_modified:
+                if result.error:
+                    print(f"  ERROR: {result.error}")
+                else:
+                    print(f"  ERROR: HTTP {result.status_code}")
+
+                errors.append({
+                    'url': entry.url,
+                    'topic': entry.topic,
+                    'status': result.status_code,
+                    'error': result.error,
+                })
+
+                # Preserve previous state if exists
+                if entry.url in state["urls"]:
+                    state["urls"][entry.url]["last_checked"] = now
+                    state["urls"][entry.url]["last_status"] = result.status_code
 
-        # Extract and hash content
-        normalized = extract_main_content(result.content)
-        new_hash = compute_hash(normalized)
+                continue
 
-        # Compare to previous state
-        url_state = state["urls"].get(entry.url, {})
-        old_hash = url_state.get("content_hash")
-        old_content = url_state.get("normalized_content", "")
-
-        if old_hash is None:
-            # New URL - baseline
-            print("  NEW: Establishing baseline")
-            state["urls"][entry.url] = {
-                "content_hash": new_hash,
-                "normalized_content": normalized,
-                "last_checked": now,
-                "last_status": 200,
-                "last_changed": now,
-                "topic": entry.topic,
-                "section": entry.section,
-            }
-        elif new_hash != old_hash:
-            # Content changed
-            classification, reason, diff_text = classify_change(old_content, normalized)
-            print(f"  CHANGED: {classification} ({reason})")
-
-            # Find affected files
-            affected = find_affected_files(entry.url, DOCS_DIR)
-
-            change = ChangeRecord(
-                url=entry.url,
-                topic=entry.topic,
-                section=entry.section,
-                classification=classification,
-                reason=reason,
-                diff_text=diff_text,
-                affected_controls=affected['controls'],
-                affected_playbooks=affected['playbooks'],
-            )
-            change.priority = determine_priority(change)
-            changes.append(change)
-
-            # Update state
-            state["urls"][entry.url] = {
-                "content_hash": new_hash,
-                "normalized_content": normalized,
-                "last_checked": now,
-                "last_status": 200,
-                "last_changed": now,
-                "topic": entry.topic,
-                "section": entry.section,
-            }
-        else:
-            # No change
-            state["urls"][entry.url]["last_checked"] = now
-            state["urls"][entry.url]["last_status"] = 200
+            # Track redirects
+            if result.was_redirected:
+                print(f"  Redirected to: {result.final_url}"
+                      + (" (remembered)" if result.remembered else ""))
+                redirects.append({
+                    'original': entry.url,
+                    'final': result.final_url,
+                    'topic': entry.topic,
+                })
+
+            url_state = state["urls"].get(entry.url, {})
+            old_hash = url_state.get("content_hash")
+
+            # Unchanged per HTTP validators or identical raw body - skip parsing
+            if analysis is None:
+                logger.debug("  Unchanged (%s)", "304" if result.not_modified else
+                             "head metadata" if result.head_unchanged else "same body")
+                url_state.update(_validator_fields(result, url_state))
+                url_state["last_checked"] = now
+                url_state["last_status"] = result.status_code
+                continue
 
-        time.sleep(REQUEST_DELAY)
+            # Extracted and hashed by the analysis stage
+            new_hash = analysis.content_hash
+            snapshot_hash = analysis.snapshot_hash or new_hash
+            if snapshot_hash != (url_state.get("snapshot_hash") or old_hash):
+                snapshots.put(analysis.snapshot_text or analysis.normalized)
+
+            if old_hash is None:
+                # New URL - baseline
+                print("  NEW: Establishing baseline")
+                state["urls"][entry.url] = {
+                    "last_checked": now,
+                    "last_status": 200,
+                    "last_changed": now,
+                    "first_checked": now,
+                    "change_count": 0,
+                    "topic": entry.topic,
+                    "section": entry.section,
+                    **_content_fields(analysis),
+                    **_validator_fields(result),
+                }
+            elif analysis.classification is not None:
+                # Content changed (classified by the analysis stage)
+                if analysis.missing_previous:
+                    logger.warning(f"No snapshot for {old_hash}; diffing against empty text")
+                classification = analysis.classification
+                reason = analysis.reason
+                diff_text = analysis.diff_text
+                print(f"  CHANGED: {classification} ({reason})")
+                if analysis.changed_sections:
+                    print(f"  Sections: {'; '.join(analysis.changed_sections)}")
+
+                # Find affected files
+                with metrics.timer("affected"):
+                    if docs_index is None:
+                        docs_index = DocsLinkIndex.build(DOCS_DIR)
+                    affected = find_affected_files(entry.url, DOCS_DIR, docs_index)
+
+                change = ChangeRecord(
+                    url=entry.url,
+                    topic=entry.topic,
+                    section=entry.section,
+                    classification=classification,
+                    reason=reason,
+                    diff_text=diff_text,
+                    affected_controls=affected['controls'],
+                    affected_playbooks=affected['playbooks'],
+                    changed_sections=analysis.changed_sections,
+                    categories=analysis.categories,
+                    near_duplicate=analysis.near_duplicate,
+                )
+                change.priority = determine_priority(change)
+                changes.append(change)
+
+                # Update state (change history feeds --schedule)
+                state["urls"][entry.url] = {
+                    "last_checked": now,
+                    "last_status": 200,
+                    "last_changed": now,
+                    "first_checked": url_state.get("first_checked") or url_state.get("last_changed", now),
+                    "change_count": url_state.get("change_count", 0) + (classification != 'noise'),
+                    "topic": entry.topic,
+                    "section": entry.section,
+                    **_content_fields(analysis),
+                    **_validator_fields(result),
+                }
+                if change.near_duplicate is not None:
+                    # Keep the old snapshot so --diff can show what was held back
+                    state["urls"][entry.url]["diff_base"] = url_state.get("snapshot_hash") or old_hash
+            else:
+                # No change
+                url_state.update(_validator_fields(result, url_state))
+                url_state["last_checked"] = now
+                url_state["last_status"] = 200
+                # Hash may still move when only the boilerplate model changed
+                for key in ("snapshot_hash", "boilerplate"):
+                    url_state.pop(key, None)
+                url_state.update(_content_fields(analysis))
+        finally:
+            # Remember where the page lives now (also on the unchanged paths)
+            if entry.url in state["urls"] and (result.status_code == 200 or result.not_modified):
+                remember_redirect(state["urls"][entry.url], result, now)
+            # Persist per-URL progress (no-op for the JSON backend)
+            if persist and entry.url in state["urls"]:
+                store.record_url(entry.url, state["urls"][entry.url],
+                                 asdict(change) if change else None)
+
+    if pool:
+        pool.shutdown()
+    session.close()  # also writes a --record cassette's index
+    if args.record:
+        print(f"Responses recorded to {args.record}")
+    if http_cache:
+        print(f"HTTP cache: {http_cache.hits} hits, {http_cache.revalidated} revalidated, "
+              f"{http_cache.misses} misses")
+    wire_bytes = sum(counts[1] for counts in transfer.values())
+    decoded_bytes = sum(counts[2] for counts in transfer.values())
+    for version, (requests_made, wire, decoded) in sorted(transfer.items()):
+        print(f"Transfer ({version}): {requests_made} responses, {wire / 1e6:.1f} MB on the wire, "
+              f"{decoded / 1e6:.1f} MB decoded")
+
+    # URLs never started because the time budget ran out or the circuit opened
+    reason = stop_reason()
+    for entry in url_entries[processed:]:
+        deferred.append({'url': entry.url, 'topic': entry.topic, 'reason': reason})
+    if deferred:
+        print(f"\n{reason or 'Fetches deferred'}: {len(deferred)} URLs deferred to the next run")
+        state["checkpoint"] = {"started": run_started}
+    else:
+        state.pop("checkpoint", None)
 
     # 4. Update state
     meaningful_changes = [c for c in changes if c.classification == 'meaningful']
+    minor_changes = [c for c in changes if c.classification == 'minor']
+    near_duplicates = [c for c in changes if c.near_duplicate is not None]
+    checked = len(url_entries) - len(deferred)
 
     state["last_run"] = now
     state["statistics"] = {
-        "total_urls": len(url_entries),
-        "last_run_checked": len(url_entries),
+        "total_urls": watchlist_size,
+        "last_run_checked": checked,
         "last_run_meaningful_changes": len(meaningful_changes),
-        "last_run_minor_changes": len(changes) - len(meaningful_changes),
+        "last_run_minor_changes": len(minor_changes),
+        "last_run_near_duplicates": len(near_duplicates),
         "last_run_redirects": len(redirects),
         "last_run_errors": len(errors),
+        "last_run_deferred": len(deferred),
+        "last_run_scheduled_later": scheduled_later,
+        "last_run_throttled": limiter.throttled,
+        "last_run_wire_bytes": wire_bytes,
+        "last_run_decoded_bytes": decoded_bytes,
     }
+    metrics.run_seconds = time.perf_counter() - run_clock
+    state["metrics"] = metrics.as_dict()
+    slowest = metrics.slowest_pages[0] if metrics.slowest_pages else None
+    if slowest:
+        logger.debug(f"Slowest fetch: {slowest['url']} ({slowest['seconds']:.2f}s)")
+
+    if args.shard:
+        store.close()
+        if args.metrics_textfile:
+            write_metrics_textfile(args.metrics_textfile, state)
+        return _write_shard(args, state, shard_urls, base_run, run_started, changes,
+                            redirects, errors, deferred)
 
     if not args.dry_run:
-        save_state(state, STATE_FILE_PATH)
+        migrated = externalize_snapshots(state, snapshots)
+        if migrated:
+            print(f"Moved {migrated} inline snapshots to {SNAPSHOT_DIR}")
+        # Measured after the state is written: in the textfile, not in state["metrics"]
+        with metrics.timer("save"):
+            store.save(state)
+        pruned = snapshots.prune(referenced_snapshots(state))
+        logger.debug(f"Pruned {pruned} unreferenced snapshots")
         print(f"\nState saved to {STATE_FILE_PATH}")
+    if args.metrics_textfile:
+        write_metrics_textfile(args.metrics_textfile, {**state, "metrics": metrics.as_dict()})
+        print(f"Metrics written to {args.metrics_textfile}")
 
     # 5. Generate report
     print("\n" + "=" * 50)
     print(f"Meaningful changes: {len(meaningful_changes)}")
-    print(f"Minor changes: {len(changes) - len(meaningful_changes)}")
+    print(f"Minor changes: {len(minor_changes)}")
+    if near_duplicates:
+        print(f"Near-duplicates (noise, not reported): {len(near_duplicates)} - "
+              f"see --diff URL")
     print(f"Redirects: {len(redirects)}")
     print(f"Errors: {len(errors)}")
+    if deferred:
+        print(f"Deferred: {len(deferred)}")
+    if scheduled_later:
+        print(f"Scheduled for a later run: {scheduled_later}")
 
+    exit_code = 0
     if is_baseline:
         print("\nBaseline established. No report generated on first run.")
-        sys.exit(0)
-
-    if meaningful_changes or errors:
-        report = generate_report(changes, redirects, errors, now, len(url_entries))
-        report_path = REPORTS_DIR / f"learn-changes-{now[:10]}.md"
+    elif meaningful_changes or errors:
+        report = generate_report(changes, redirects, errors, now, checked, deferred,
+                                 scheduled_later)
+        report_path = report_path_for(now)
 
         if not args.dry_run:
             report_path.parent.mkdir(parents=True, exist_ok=True)
@@ -846,10 +3863,15 @@ def _run_monitor(args):
             print(f"Report saved to {report_path}")
 
         print(f"\n{len(meaningful_changes)} meaningful changes detected - exit code 1 for CI")
-        sys.exit(1)
+        exit_code = 1
     else:
         print("\nNo meaningful changes detected")
-        sys.exit(0)
+
+    if persist:
+        # Reported (or below the report threshold): no longer pending
+        store.clear_changes()
+    store.close()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
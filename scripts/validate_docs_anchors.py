@@ -12,6 +12,10 @@ Scope
   - an explicit heading ID via attr_list: ## Heading {#fragment}
   - an auto-derived heading slug (best-effort) from Markdown headings
 
+Cache
+- Per-file links and anchors come from docs_link_index.DocsLinkCache, so only files
+  changed since the last run are re-parsed. Pass --no-cache to parse everything.
+
 Notes
 - This is intentionally conservative: it ignores external URLs and links to non-.md assets.
 - The slugification is a best-effort approximation of MkDocs' heading IDs; explicit IDs are preferred
@@ -20,7 +24,6 @@ Notes
 
 from __future__ import annotations
 
-import re
 import sys
 from dataclasses import dataclass
 
@@ -30,24 +33,14 @@ if sys.platform == 'win32':
 from pathlib import Path
 from typing import Iterable, Optional
 
+from docs_link_index import DocsLinkCache
+
 DOCS_DIR = Path(__file__).resolve().parents[1] / "docs"
 
 # Keep in sync with mkdocs.yml `exclude_docs:`. These directories are not published.
 DEFAULT_EXCLUDED_TOP_LEVEL_DIRS = {"images", "scripts", "templates"}
 
 
-_LINK_RE = re.compile(r"\[[^\]]+\]\(([^)]+)\)")
-
-# HTML anchor: <a id="foo"></a>
-_HTML_ID_RE = re.compile(r"<a\s+id=\"([^\"]+)\"\s*></a>", re.IGNORECASE)
-
-# Attr_list heading IDs: ## Title {#foo}
-_ATTR_LIST_ID_RE = re.compile(r"\{#([A-Za-z0-9][A-Za-z0-9_-]*)\}\s*$")
-
-# Markdown headings: # / ## / ### ...
-_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$")
-
-
 @dataclass(frozen=True)
 class LinkIssue:
     source_file: Path
@@ -58,23 +51,6 @@ class LinkIssue:
     reason: str
 
 
-def _strip_inline_code(text: str) -> str:
-    return re.sub(r"`[^`]+`", "", text)
-
-
-def _slugify_heading(text: str) -> str:
-    """Best-effort slugifier for MkDocs-style heading IDs."""
-    text = _strip_inline_code(text)
-    text = text.strip().lower()
-
-    # Remove common punctuation, keep alphanumerics, spaces, underscores, hyphens.
-    text = re.sub(r"[^a-z0-9 _-]", "", text)
-    text = text.replace("_", "-")
-    text = re.sub(r"\s+", "-", text)
-    text = re.sub(r"-+", "-", text).strip("-")
-    return text
-
-
 def _split_link_target(raw: str) -> tuple[str, Optional[str]]:
     """Return (path_part, fragment) where fragment excludes the leading '#'."""
     raw = raw.strip()
@@ -144,32 +120,6 @@ def _resolve_target_file(source_file: Path, path_part: str) -> Optional[Path]:
     return resolved
 
 
-def _collect_anchors(md_text: str) -> set[str]:
-    anchors: set[str] = set()
-
-    for match in _HTML_ID_RE.finditer(md_text):
-        anchors.add(match.group(1).strip())
-
-    for line in md_text.splitlines():
-        heading_match = _HEADING_RE.match(line)
-        if not heading_match:
-            continue
-
-        heading_text = heading_match.group(2).strip()
-
-        # If explicit {#id} is present at end, use it and also consider the slug of the visible text.
-        id_match = _ATTR_LIST_ID_RE.search(heading_text)
-        if id_match:
-            anchors.add(id_match.group(1))
-            heading_text = _ATTR_LIST_ID_RE.sub("", heading_text).strip()
-
-        slug = _slugify_heading(heading_text)
-        if slug:
-            anchors.add(slug)
-
-    return anchors
-
-
 def _iter_markdown_files(
     root: Path,
     *,
@@ -186,64 +136,62 @@ def validate_docs_anchors(
     docs_dir: Path = DOCS_DIR,
     *,
     excluded_top_level_dirs: set[str] | None = None,
+    cache: DocsLinkCache | None = None,
 ) -> list[LinkIssue]:
     issues: list[LinkIssue] = []
 
     if excluded_top_level_dirs is None:
         excluded_top_level_dirs = set(DEFAULT_EXCLUDED_TOP_LEVEL_DIRS)
 
+    if cache is None:
+        cache = DocsLinkCache(docs_dir, cache_path=None)
+
     anchor_cache: dict[Path, set[str]] = {}
 
     for md_file in _iter_markdown_files(docs_dir, excluded_top_level_dirs=excluded_top_level_dirs):
-        try:
-            content = md_file.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
-            content = md_file.read_text(encoding="utf-8-sig")
-
-        for i, line in enumerate(content.splitlines(), start=1):
-            for link_match in _LINK_RE.finditer(line):
-                raw_target = link_match.group(1)
-                path_part, fragment = _split_link_target(raw_target)
-
-                if fragment is None:
-                    continue
-
-                target_file = _resolve_target_file(md_file, path_part)
-                if target_file is None:
-                    continue
-
-                if not target_file.exists():
-                    issues.append(
-                        LinkIssue(
-                            source_file=md_file,
-                            source_line=i,
-                            raw_link=raw_target,
-                            target_file=target_file,
-                            fragment=fragment,
-                            reason="target markdown file does not exist",
-                        )
+        facts = cache.facts(md_file)
+        if facts is None:
+            continue
+
+        for i, raw_target in facts.fragment_links:
+            path_part, fragment = _split_link_target(raw_target)
+
+            if fragment is None:
+                continue
+
+            target_file = _resolve_target_file(md_file, path_part)
+            if target_file is None:
+                continue
+
+            if not target_file.exists():
+                issues.append(
+                    LinkIssue(
+                        source_file=md_file,
+                        source_line=i,
+                        raw_link=raw_target,
+                        target_file=target_file,
+                        fragment=fragment,
+                        reason="target markdown file does not exist",
                     )
-                    continue
-
-                if target_file not in anchor_cache:
-                    try:
-                        t = target_file.read_text(encoding="utf-8")
-                    except UnicodeDecodeError:
-                        t = target_file.read_text(encoding="utf-8-sig")
-                    anchor_cache[target_file] = _collect_anchors(t)
-
-                anchors = anchor_cache[target_file]
-                if fragment not in anchors:
-                    issues.append(
-                        LinkIssue(
-                            source_file=md_file,
-                            source_line=i,
-                            raw_link=raw_target,
-                            target_file=target_file,
-                            fragment=fragment,
-                            reason="fragment not found in target (add explicit anchor/id)",
-                        )
+                )
+                continue
+
+            if target_file not in anchor_cache:
+                target_facts = cache.facts(target_file)
+                anchor_cache[target_file] = set(target_facts.anchors) if target_facts else set()
+
+            anchors = anchor_cache[target_file]
+            if fragment not in anchors:
+                issues.append(
+                    LinkIssue(
+                        source_file=md_file,
+                        source_line=i,
+                        raw_link=raw_target,
+                        target_file=target_file,
+                        fragment=fragment,
+                        reason="fragment not found in target (add explicit anchor/id)",
                     )
+                )
 
     return issues
 
@@ -251,17 +199,30 @@ def validate_docs_anchors(
 def main(argv: list[str]) -> int:
     docs_dir = DOCS_DIR
     include_excluded = False
+    use_cache = True
 
     args = argv[1:]
     if "--include-excluded" in args:
         include_excluded = True
         args = [a for a in args if a != "--include-excluded"]
+    if "--no-cache" in args:
+        use_cache = False
+        args = [a for a in args if a != "--no-cache"]
 
     if len(args) > 0:
         docs_dir = Path(args[0]).resolve()
 
+    # The shared cache only covers the repo's own docs tree.
+    cache = DocsLinkCache(docs_dir, cache_path=None)
+    if use_cache and docs_dir == DOCS_DIR:
+        cache = DocsLinkCache(docs_dir)
+
     excluded = set() if include_excluded else set(DEFAULT_EXCLUDED_TOP_LEVEL_DIRS)
-    issues = validate_docs_anchors(docs_dir, excluded_top_level_dirs=excluded)
+    issues = validate_docs_anchors(docs_dir, excluded_top_level_dirs=excluded, cache=cache)
+    try:
+        cache.save()
+    except OSError as e:
+        print(f"WARNING: Could not save docs link cache: {e}")
     if not issues:
         print("✅ Docs anchor validation passed (no broken #fragments).")
         return 0